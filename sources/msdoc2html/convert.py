@@ -10,12 +10,6 @@ import re
 from pathlib import Path
 from html_to_nena import html_todict
 
-# first arg should be directory containing dialect subdirectories
-# ex:
-# dialects
-#     Barwar
-#     Urmi_C
-dialects = list(Path(sys.argv[1]).glob('*'))
 version = '0.01'
 output = f'../../texts/{version}/{{dialect}}' # markdown files to go here
 
@@ -170,20 +164,33 @@ def exportdialect(textdict, dialect='', out_dir='{dialect}'):
         with open(outfile, 'w') as out:
             out.write(markdown)
 
+def file_config(file):
+    """Get the html_todict arguments for an HTML file."""
+    return next(patts for filepatt, patts in configs.items()
+                    if re.match(filepatt, str(file.name)))
+
 # run the conversion
-for dialect in dialects:
-    for file in dialect.glob('*.html'):
-        
-        print(f'processing {file.name}')
-        
-        config = next(patts for filepatt, patts in configs.items() 
-                            if re.match(filepatt, str(file.name)))
-        
-        texts = html_todict(
-            file,
-            **config
-        )
-        dialect_name = dialect.name
-        exportdialect(texts, dialect=dialect_name, out_dir=output)
-
-os.system("cd ~/github/CambridgeSemiticsLab/nena_corpus/sources/scripts/; sh corrections.sh")
+if __name__ == '__main__':
+
+    # first arg should be directory containing dialect subdirectories
+    # ex:
+    # dialects
+    #     Barwar
+    #     Urmi_C
+    dialects = list(Path(sys.argv[1]).glob('*'))
+
+    for dialect in dialects:
+        for file in dialect.glob('*.html'):
+
+            print(f'processing {file.name}')
+
+            config = file_config(file)
+
+            texts = html_todict(
+                file,
+                **config
+            )
+            dialect_name = dialect.name
+            exportdialect(texts, dialect=dialect_name, out_dir=output)
+
+    os.system("cd ~/github/CambridgeSemiticsLab/nena_corpus/sources/scripts/; sh corrections.sh")
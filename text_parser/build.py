@@ -0,0 +1,323 @@
+"""
+Build the parsed NENA corpus from NENA-formatted texts.
+
+Run instructions:
+    python build.py [--config FILE] [--version V] [--dialect D ...]
+                    [--jobs N] [--format {1,2,3}] [--force] [--graphemes]
+                    [--profile FILE] [indir] [outdir]
+
+The input directory holds a subdirectory of .nena files per dialect,
+e.g. texts/alpha/Barwar. Each text is parsed and written to a JSON
+file with the same name under the output directory, e.g.
+parsed_texts/alpha/Barwar. See formats.py for the output formats.
+
+Options that are not given on the command line are taken from
+config.json, or the file given with --config:
+
+    version: the corpus version; the output goes to
+        parsed_texts/<version>
+    nena_indir: the input directory, relative to the config file;
+        with --version, texts/<version> is used instead
+    format: the output format version, 1 by default
+    jobs: the number of worker processes, 1 by default
+    dialects: the dialects to build; all if empty or missing
+
+With a dialect filter, only the texts of those dialects are parsed,
+and the output of other dialects is left as it is.
+
+Texts are parsed in a pool of worker processes. Each worker loads the
+standards once, when it imports the parser, and then parses one text
+after another. Texts are handed out and their results collected in
+the sorted order of their file paths, whatever the number of workers.
+A text that fails to parse does not stop the build; all failures are
+reported together at the end.
+
+Builds are incremental: a text is only parsed again if its source, or
+the standards of its dialect, changed since it was last built. See
+manifest.py.
+
+With --profile FILE, the time of each stage of the build and counts of
+tokens, words and lookups are written to FILE as JSON; see profiling.py.
+"""
+
+import sys
+import json
+import argparse
+import traceback
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from nena_parser import NenaLexer, GraphemeLexer, NenaParser
+from formats import (
+    compact_text, add_parsings, encode_text, encode_compact,
+    write_parsings, read_parsings, ParsingTable, PARSINGS_FILE,
+)
+from manifest import Manifest, MANIFEST_FILE, hash_file, hash_dialect
+import profiling
+from profiling import stage
+
+TEXT_PARSER = Path(__file__).resolve().parent
+PROJECT = TEXT_PARSER.parent
+CONFIG = TEXT_PARSER.joinpath('config.json')
+
+# lexer and parsers of the current process,
+# kept for all texts parsed by a worker
+lexer = NenaLexer()
+dialect2parser = {}
+
+def set_lexer(graphemes=False):
+    """Choose the lexer of the current process, see GraphemeLexer."""
+    global lexer
+    lexer = GraphemeLexer() if graphemes else NenaLexer()
+
+def init_worker(graphemes=False, profile=False):
+    """Set up a worker process like the main process."""
+    set_lexer(graphemes)
+    if profile:
+        profiling.enable()
+
+def parse_text(file):
+    """Parse a .nena file with the parser of its dialect directory."""
+    dialect = file.parent.name
+    if dialect not in dialect2parser:
+        dialect2parser[dialect] = NenaParser(dialect)
+    parser = dialect2parser[dialect]
+    with stage('read'):
+        text = file.read_text()
+    tokens = lexer.tokenize(text)
+    if profiling.profile is not None:
+        # the parser pulls tokens from the lexer as it goes,
+        # so they are lexed up front to time both on their own
+        with stage('lex'):
+            tokens = list(tokens)
+        profiling.count('tokens', len(tokens))
+        tokens = iter(tokens)
+    with stage('parse'):
+        return parser.parse(tokens)
+
+def write_data(data, outfile):
+    with stage('write'):
+        outfile.parent.mkdir(parents=True, exist_ok=True)
+        with open(outfile, 'w') as output:
+            output.write(data)
+
+def build_text(file, outfile, version):
+    """Parse a text and write it in the given format version.
+
+    Version 3 texts share a parsings table with the rest of the
+    corpus, which is kept by the main process. For those, the text
+    is returned in compact form, to be written by the main process.
+
+    Returns:
+        3-tuple of compact text or None, error message or None, and
+        the profiling stats of the text, or None if profiling is off
+    """
+    try:
+        parsed = parse_text(file)
+        if version == 3:
+            with stage('encode'):
+                compact = compact_text(parsed)
+            return compact, None, profiling.take()
+        with stage('encode'):
+            data = encode_text(parsed, version=version)
+        write_data(data, outfile)
+        return None, None, profiling.take()
+    except Exception as error:
+        return None, ''.join(traceback.format_exception_only(error)).strip(), profiling.take()
+
+def build_corpus(indir, outdir, version=1, jobs=1, force=False, graphemes=False,
+                 profile=None, dialects=None):
+    """Parse the texts in indir and write them to outdir.
+
+    Only texts whose source or standards changed since the last
+    build, as recorded in the manifest in outdir, are parsed again,
+    unless force is True.
+
+    Arguments:
+        indir (pathlib.Path): directory with a subdirectory of
+            .nena files per dialect
+        outdir (pathlib.Path): directory to write parsed texts to
+        version (int): output format version, see formats.py
+        jobs (int): number of worker processes
+        force (bool): if True, parse all texts
+        graphemes (bool): if True, tokenize with GraphemeLexer,
+            which gives the same tokens as NenaLexer
+        profile (pathlib.Path): if given, profile the build and
+            write the report to this file, see profiling.py
+        dialects (list): if given, only build the texts of
+            these dialects
+
+    Returns:
+        list of 2-tuples of failed file and error message
+    """
+    report = profiling.Report() if profile else None
+    files = sorted(indir.glob('*/*.nena'))
+    if dialects is not None:
+        missing = set(dialects) - set(file.parent.name for file in files)
+        if missing:
+            raise Exception(f'no texts of dialect(s) {sorted(missing)} in {indir}')
+        files = [file for file in files if file.parent.name in dialects]
+    keys = [str(file.relative_to(indir)) for file in files]
+    manifest = Manifest(outdir.joinpath(MANIFEST_FILE), version)
+    parsings_file = outdir.joinpath(PARSINGS_FILE)
+
+    # texts of other dialects are left alone
+    selected = [
+        key for key in manifest.texts
+            if dialects is None or Path(key).parts[0] in dialects
+    ]
+
+    # version 3 texts can only be kept along with the parsings table
+    if version == 3 and not parsings_file.exists():
+        manifest.texts.clear()
+    elif force:
+        for key in selected:
+            manifest.remove(key)
+
+    # remove the output of texts that no longer exist
+    for key in set(selected) - set(keys):
+        outdir.joinpath(key).with_suffix('.json').unlink(missing_ok=True)
+        manifest.remove(key)
+
+    # find the texts that need to be parsed
+    dialect2hash = {}
+    todo = []
+    for file, key in zip(files, keys):
+        dialect = file.parent.name
+        if dialect not in dialect2hash:
+            dialect2hash[dialect] = hash_dialect(dialect)
+        outfile = outdir.joinpath(key).with_suffix('.json')
+        source_hash = hash_file(file)
+        standards_hash = dialect2hash[dialect]
+        if manifest.is_current(key, source_hash, standards_hash, outfile):
+            continue
+        todo.append((file, key, outfile, source_hash, standards_hash))
+    print(f'parsing {len(todo)} of {len(files)} texts')
+
+    parsings = None
+    if version == 3:
+        if manifest.texts:
+            parsings = ParsingTable(read_parsings(parsings_file))
+        else:
+            parsings = ParsingTable()
+
+    todo_files = [file for file, *_ in todo]
+    todo_outfiles = [outfile for _, _, outfile, *_ in todo]
+    versions = [version] * len(todo)
+    init_worker(graphemes, bool(profile))
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                       initargs=(graphemes, bool(profile)))
+        results = executor.map(build_text, todo_files, todo_outfiles, versions)
+    else:
+        executor = None
+        results = map(build_text, todo_files, todo_outfiles, versions)
+
+    errors = []
+    try:
+        for (file, key, outfile, *hashes), (compact, error, stats) in zip(todo, results):
+            if report is not None:
+                report.add(key, stats)
+            if error:
+                print(f'FAILED: {key}')
+                errors.append((file, error))
+                manifest.remove(key)
+                continue
+            if compact is not None:
+                with stage('encode'):
+                    add_parsings(compact, parsings)
+                    data = encode_compact(compact)
+                write_data(data, outfile)
+            manifest.update(key, *hashes)
+            print(f'\t√ {key}')
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if parsings is not None:
+        outdir.mkdir(parents=True, exist_ok=True)
+        with stage('write'):
+            write_parsings(parsings, parsings_file)
+    manifest.save()
+
+    if report is not None:
+        # stages of version 3 texts run in the main process,
+        # after their worker's stats were taken
+        report.add(None, profiling.take())
+        report.write(profile)
+        profiling.disable()
+
+    return errors
+
+def load_config(path=CONFIG):
+    """Read a build configuration, see the module docs."""
+    with open(path, 'r') as infile:
+        return json.load(infile)
+
+def corpus_dirs(args, config):
+    """Get the input and output directories of a command.
+
+    Arguments:
+        args (argparse.Namespace): with the indir, outdir, version
+            and config options of build.py
+        config (dict): the configuration, see load_config
+
+    Returns:
+        2-tuple of the input and output directories
+    """
+    version = args.version or config['version']
+    if args.indir is not None:
+        indir = args.indir
+    elif args.version is not None:
+        indir = PROJECT.joinpath('texts', version)
+    else:
+        indir = args.config.parent.joinpath(config['nena_indir'])
+    outdir = args.outdir or PROJECT.joinpath('parsed_texts', version)
+    return indir, outdir
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Build the parsed NENA corpus.')
+    argparser.add_argument('indir', nargs='?', type=Path,
+                           help='directory with a subdirectory of .nena files per dialect')
+    argparser.add_argument('outdir', nargs='?', type=Path,
+                           help='directory to write the parsed texts to')
+    argparser.add_argument('--config', type=Path, default=CONFIG,
+                           help='configuration file, see the module docs')
+    argparser.add_argument('--version', metavar='V',
+                           help='corpus version, e.g. alpha')
+    argparser.add_argument('--dialect', action='append', metavar='D',
+                           help='only build the texts of this dialect; can be repeated')
+    argparser.add_argument('-j', '--jobs', type=int,
+                           help='number of texts to parse at the same time')
+    argparser.add_argument('--format', type=int, choices=(1, 2, 3),
+                           help='output format version, see formats.py')
+    argparser.add_argument('--force', action='store_true',
+                           help='parse all texts, even those that are up to date')
+    argparser.add_argument('--graphemes', action='store_true',
+                           help='match letters by grapheme instead of by regex')
+    argparser.add_argument('--profile', type=Path, metavar='FILE',
+                           help='write a JSON report of the time of each stage to FILE')
+    args = argparser.parse_args(argv)
+
+    config = load_config(args.config)
+    indir, outdir = corpus_dirs(args, config)
+    format_version = args.format or config.get('format', 1)
+    if format_version not in (1, 2, 3):
+        raise Exception(f'unknown format version {format_version} in {args.config}')
+    jobs = args.jobs or config.get('jobs', 1)
+    dialects = args.dialect or config.get('dialects') or None
+
+    errors = build_corpus(indir, outdir, version=format_version,
+                          jobs=jobs, force=args.force,
+                          graphemes=args.graphemes, profile=args.profile,
+                          dialects=dialects)
+
+    if errors:
+        print(f'\n{len(errors)} text(s) failed to parse:\n')
+        for file, error in errors:
+            print(f'{file.parent.name}/{file.name}: {error}')
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Corpus bundles: one JSON Lines file per dialect.
+
+Run instructions:
+    python bundles.py [--compression {none,gzip,xz}] [--dialect D ...]
+                      [corpus_dir] outdir
+
+A parsed corpus directory holds a JSON file per text, which readers
+open and parse one by one. A bundle holds all texts of a dialect in
+one file instead, with one line per text:
+
+    {"title": "A Hundred Gold Coins", "format": 2, "metadata": {...},
+     "chars": [...], "text": [...]}
+
+Each line is the text in format version 2 (see formats.py) with its
+title added. The parsing records are kept in the text, even if the
+corpus is in version 3, so every line can be read on its own.
+
+Bundles can be compressed with gzip or xz. Each line is then
+compressed on its own, as a separate gzip member or xz stream, which
+both formats allow to follow each other in one file. The file can be
+read from start to end like any other gzip or xz file, and a single
+text can be read by decompressing only its own part.
+
+Next to each bundle, an index gives the byte offset and length of
+each text in the bundle file, so that a text can be read without
+reading the others:
+
+    outdir/
+        Barwar.jsonl.gz
+        Barwar.index.json
+        Urmi_C.jsonl.gz
+        Urmi_C.index.json
+
+    {"format": 1, "dialect": "Barwar", "file": "Barwar.jsonl.gz",
+     "compression": "gzip", "texts": [["A Hundred Gold Coins", 0, 52811], ...]}
+
+`BundleCorpus` reads a directory of bundles with the same methods
+as formats.Corpus, and `iter_texts` streams all texts in order.
+"""
+
+import os
+import gzip
+import lzma
+import json
+import argparse
+from pathlib import Path
+
+from formats import Corpus, compact_text, expand_text, PARSINGS_FILE
+
+PROJECT = Path(__file__).resolve().parent.parent
+VERSION = 'alpha'
+BUNDLE_VERSION = 1
+INDEX_SUFFIX = '.index.json'
+
+# file suffix and module of each compression
+COMPRESSIONS = {
+    'none': ('.jsonl', None),
+    'gzip': ('.jsonl.gz', gzip),
+    'xz': ('.jsonl.xz', lzma),
+}
+
+def compress(data, compression):
+    """Compress the bytes of one line of a bundle."""
+    if compression == 'gzip':
+        # no timestamp, so that the same texts give the same bundle
+        return gzip.compress(data, mtime=0)
+    if compression == 'xz':
+        return lzma.compress(data)
+    return data
+
+def decompress(data, compression):
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    if compression == 'xz':
+        return lzma.decompress(data)
+    return data
+
+def encode_line(title, parsed):
+    """Encode a parsed text as a line of a bundle, in bytes."""
+    record = {'title': title, **compact_text(parsed)}
+    return (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf8')
+
+def decode_line(line, expand=True):
+    """Decode a line of a bundle.
+
+    Returns:
+        title, and the text as given by formats.read_text
+    """
+    record = json.loads(line)
+    title = record.pop('title')
+    return title, expand_text(record) if expand else record
+
+def write_bundle(outdir, dialect, texts, compression='gzip'):
+    """Write the texts of a dialect to a bundle and its index.
+
+    Texts are written one at a time, so only one is held in memory.
+    Both files are written under temporary names and then moved into
+    place, so that readers never see a partial bundle.
+
+    Arguments:
+        outdir (pathlib.Path): directory to write the bundle to
+        dialect (str): name of the dialect
+        texts (iterable): (title, parsed) tuples, with the parsed
+            text in the parser's output shape
+        compression (str): one of COMPRESSIONS
+
+    Returns:
+        dict of the index
+    """
+    if compression not in COMPRESSIONS:
+        raise Exception(f'unknown compression {compression}; choose from {list(COMPRESSIONS)}')
+    suffix = COMPRESSIONS[compression][0]
+    outdir.mkdir(parents=True, exist_ok=True)
+    path = outdir.joinpath(f'{dialect}{suffix}')
+    index_path = outdir.joinpath(f'{dialect}{INDEX_SUFFIX}')
+    index = {
+        'format': BUNDLE_VERSION,
+        'dialect': dialect,
+        'file': path.name,
+        'compression': compression,
+        'texts': [],
+    }
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}')
+    offset = 0
+    with open(tmp, 'wb') as outfile:
+        for title, parsed in texts:
+            data = compress(encode_line(title, parsed), compression)
+            outfile.write(data)
+            index['texts'].append([title, offset, len(data)])
+            offset += len(data)
+    tmp_index = index_path.with_name(f'.{index_path.name}.{os.getpid()}')
+    with open(tmp_index, 'w') as outfile:
+        json.dump(index, outfile, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+    os.replace(tmp_index, index_path)
+    return index
+
+def write_bundles(corpus, outdir, compression='gzip', dialects=None):
+    """Write a bundle per dialect of a parsed corpus.
+
+    Arguments:
+        corpus (formats.Corpus): parsed corpus, in any format version
+        outdir (pathlib.Path): directory to write the bundles to
+        compression (str): one of COMPRESSIONS
+        dialects (list): dialects to write; all if None
+
+    Returns:
+        list of the index dicts of the bundles
+    """
+    dialect2titles = {}
+    for dialect, title in corpus.texts():
+        dialect2titles.setdefault(dialect, []).append(title)
+    if dialects:
+        unknown = set(dialects) - set(dialect2titles)
+        if unknown:
+            raise Exception(f'no texts of dialect {", ".join(sorted(unknown))} in {corpus.path}')
+        dialect2titles = {d: t for d, t in dialect2titles.items() if d in dialects}
+    # the parsing ids of a version 3 corpus are replaced by their records
+    resolve = corpus.path.joinpath(PARSINGS_FILE).exists()
+    return [
+        write_bundle(outdir, dialect, (
+            (title, corpus.read(dialect, title, resolve)) for title in titles
+        ), compression)
+            for dialect, titles in dialect2titles.items()
+    ]
+
+class Bundle:
+    """Reader for the bundle of one dialect."""
+
+    def __init__(self, index_path):
+        index_path = Path(index_path)
+        with open(index_path, 'r') as infile:
+            index = json.load(infile)
+        if index.get('format') != BUNDLE_VERSION:
+            raise Exception(f'unknown bundle version {index.get("format")} in {index_path}')
+        self.dialect = index['dialect']
+        self.compression = index['compression']
+        self.path = index_path.with_name(index['file'])
+        self.index = {title: (offset, length) for title, offset, length in index['texts']}
+
+    def titles(self):
+        return list(self.index)
+
+    def read(self, title, expand=True):
+        """Read one text, without reading the rest of the bundle.
+
+        Returns:
+            the text as given by formats.read_text
+        """
+        try:
+            offset, length = self.index[title]
+        except KeyError:
+            raise Exception(f'no text {title} in {self.path}')
+        with open(self.path, 'rb') as infile:
+            infile.seek(offset)
+            data = infile.read(length)
+        return decode_line(decompress(data, self.compression), expand)[1]
+
+    def __iter__(self):
+        """Read all texts in order, one at a time.
+
+        Yields:
+            (title, text) tuples, with the text as given by read
+        """
+        module = COMPRESSIONS[self.compression][1]
+        opener = module.open if module else open
+        with opener(self.path, 'rb') as infile:
+            for line in infile:
+                yield decode_line(line)
+
+class BundleCorpus:
+    """Reader for a directory of bundles, like formats.Corpus.
+
+    The texts of bundles hold their own parsing records, so
+    `resolve` is accepted but has nothing left to do.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.bundles = {}
+        for index_path in sorted(self.path.glob(f'*{INDEX_SUFFIX}')):
+            bundle = Bundle(index_path)
+            self.bundles[bundle.dialect] = bundle
+
+    def texts(self):
+        """List the texts of the corpus as (dialect, title) tuples."""
+        return [
+            (dialect, title)
+                for dialect, bundle in self.bundles.items()
+                    for title in bundle.titles()
+        ]
+
+    def read(self, dialect, title, resolve=False):
+        """Read a text in the parser's output shape."""
+        try:
+            bundle = self.bundles[dialect]
+        except KeyError:
+            raise Exception(f'no bundle of dialect {dialect} in {self.path}')
+        return bundle.read(title)
+
+    def iter_texts(self):
+        """Read all texts in order, a bundle at a time.
+
+        Yields:
+            (dialect, title, text) tuples
+        """
+        for dialect, bundle in self.bundles.items():
+            for title, text in bundle:
+                yield dialect, title, text
+
+    def get_parsings(self, word):
+        return word['parsings']
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Write a parsed NENA corpus as bundles per dialect.')
+    argparser.add_argument('corpus', type=Path, nargs='?',
+                           default=PROJECT.joinpath('parsed_texts', VERSION),
+                           help='directory of the parsed corpus')
+    argparser.add_argument('outdir', type=Path,
+                           help='directory to write the bundles to')
+    argparser.add_argument('--compression', choices=COMPRESSIONS, default='gzip')
+    argparser.add_argument('--dialect', action='append', dest='dialects',
+                           help='dialect to write; by default, all')
+    args = argparser.parse_args(argv)
+
+    corpus_size = sum(file.stat().st_size for file in args.corpus.glob('*/*.json'))
+    for index in write_bundles(Corpus(args.corpus), args.outdir, args.compression, args.dialects):
+        size = args.outdir.joinpath(index['file']).stat().st_size
+        print(f"{index['file']}: {len(index['texts'])} texts, {size:,} bytes")
+    print(f'from {corpus_size:,} bytes of JSON files')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+Character standards for the NENA lexer.
+
+Letters and punctuation are defined in standards/alphabet/alphabet.json
+and standards/punctuation/punctuation.json. Each character has a
+'decomposed_regex' used by the lexer to recognize it, along with
+metadata such as its phonetic class or position. Transcriptions of
+each character, stored under standards/transcriptions/<dialect>, are
+keyed by that same regex. They are gathered into a TranscriptionMatrix
+per dialect, which gives each character an integer id, and each id a
+tuple of its transcriptions in all of the dialect's schemes.
+
+A character's metadata depends only on its string, its kind (letter,
+punctuation or foreign letter) and the dialect of the text it occurs
+in. The records are therefore built once per dialect, kept in a table
+keyed by (decomposed_string, kind), and shared between all tokens of
+the same character. Shared records are read-only. The tables of the
+standard characters are kept in the standards bundle, see
+standards_bundle.py.
+"""
+
+import re
+import json
+import collections
+import unicodedata
+from pathlib import Path
+
+from standards_bundle import load_section
+
+STANDARDS = Path(__file__).resolve().parent.parent.joinpath('standards')
+TRANSCRIPTIONS = STANDARDS.joinpath('transcriptions')
+
+# prepare alphabet and punctuation standards for processing
+alphabet_std = STANDARDS.joinpath('alphabet/alphabet.json')
+punctuation_std = STANDARDS.joinpath('punctuation/punctuation.json')
+lang_std = STANDARDS.joinpath('languages/foreign_languages.json')
+dialect_std = STANDARDS.joinpath('languages/dialects.json')
+
+with open(alphabet_std, 'r') as infile:
+    alphabet_data = json.load(infile)
+with open(punctuation_std, 'r') as infile:
+    punct_data = json.load(infile)
+with open(lang_std, 'r') as infile:
+    lang_data = json.load(infile)
+with open(dialect_std, 'r') as infile:
+    dialect_data = json.load(infile)
+
+alphabet_re = '|'.join(let['decomposed_regex'] for let in alphabet_data)
+punct_begin_re = '|'.join(punct['decomposed_regex'] for punct in punct_data
+                            if punct['position'] == 'begin')
+
+punct_end_re = '|'.join(punct['decomposed_regex'] for punct in punct_data
+                            if punct['position'] == 'end')
+
+foreign_codes = '|'.join(lang['code'] for lang in lang_data)
+
+# decomposed strings of all letters, in lower and upper case
+alphabet_strings = {
+    string for let in alphabet_data
+        for string in (let['decomposed_string'], let['decomposed_upper_string'])
+}
+
+# prepare letter and punctuation data for
+# matching on a letter-by-letter basis; the regexes
+# are only compiled once a character is matched
+metakeys = {
+    'punctuation': {'decomposed_regex', 'decomposed_string', 'class', 'position', 'modifies'},
+    'letter': {'decomposed_regex', 'decomposed_string', 'phonetic_class', 'phonetic_place', 'phonetic_manner', 'phonation'},
+}
+char_metadata = collections.defaultdict(list)
+for item, data in [('letter', alphabet_data), ('punctuation', punct_data)]:
+    for chardata in data:
+        re_pattern = chardata['decomposed_regex']
+        metadata = {k:v for k,v in chardata.items() if k in metakeys[item]}
+        char_metadata[item].append((re_pattern, metadata))
+
+# prep transcriptions
+dialect2re2trans = collections.defaultdict(dict)
+for dialect in sorted(TRANSCRIPTIONS.glob('[! .]*')): # glob patt excludes hidden dirs
+    for trans in sorted(dialect.glob('*.json')):
+        dialect2re2trans[dialect.name][trans.stem] = {
+            unicodedata.normalize('NFD', k):v for k,v in json.loads(trans.read_text()).items()
+        }
+
+class TranscriptionMatrix:
+    """Transcriptions of the characters of a dialect in all of its schemes.
+
+    The schemes are those under transcriptions/ALL followed by those
+    of the dialect, e.g. ('full', 'lite', 'text', 'text_nostress',
+    'fuzzy'). Characters are keyed by their decomposed regex, or for
+    foreign letters by their string, and numbered in the order they
+    are added: the standard letters and punctuation first, so that
+    their ids are the same in all dialects, then any others as they
+    are met. Row i of the matrix holds the transcriptions of
+    character i, in the order of the schemes.
+    """
+
+    def __init__(self, dialect):
+        self.dialect = dialect
+        tables = [
+            (scheme, table)
+                for t_dialect, transers in dialect2re2trans.items()
+                    if t_dialect == 'ALL' or t_dialect == dialect
+                        for scheme, table in transers.items()
+        ]
+        self.schemes = tuple(scheme for scheme, table in tables)
+        self.tables = [table for scheme, table in tables]
+        self.key2id = {}
+        self.rows = []
+        for data in (alphabet_data, punct_data):
+            for chardata in data:
+                self.add(chardata['decomposed_regex'])
+
+    def add(self, key):
+        """Get the id of a character, adding its row if new."""
+        char_id = self.key2id.get(key)
+        if char_id is None:
+            char_id = self.key2id[key] = len(self.rows)
+            self.rows.append(tuple(table.get(key, '') for table in self.tables))
+        return char_id
+
+    def row(self, key):
+        """Get the transcriptions of a character in all schemes."""
+        return self.rows[self.add(key)]
+
+    def transcribe(self, chars, scheme):
+        """Transcribe a sequence of characters, e.g. the letters of a word.
+
+        Arguments:
+            chars (iterable): character records, as made by build_char
+            scheme (str): name of the transcription scheme
+
+        Returns:
+            string of the characters' transcriptions joined together
+        """
+        i = self.schemes.index(scheme)
+        rows = self.rows
+        return ''.join(
+            rows[self.add(char.get('decomposed_regex') or char['decomposed_string'])][i]
+                for char in chars
+        )
+
+dialect2matrix = {
+    dialect['code']: TranscriptionMatrix(dialect['code'])
+        for dialect in dialect_data
+}
+
+def get_matrix(dialect):
+    """Get the TranscriptionMatrix of a dialect, making it if needed."""
+    matrix = dialect2matrix.get(dialect)
+    if matrix is None:
+        matrix = dialect2matrix[dialect] = TranscriptionMatrix(dialect)
+    return matrix
+
+class FrozenDict(dict):
+    """Dictionary that cannot be modified after it is made.
+
+    Character records are shared between every token of the
+    same character, so a change made to one token would show
+    up on all of them. Make a copy with dict(record) to modify.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f'{self.__class__.__name__} is read-only')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+def get_metadata(string, data_list):
+    """Retrieve metadata based on list of 2-tuples of regex and metadata."""
+    for re_pattern, metadata in data_list:
+        if re.match(re_pattern, string):
+            return metadata
+
+def match_transcriptions(char_re, dialect):
+    """Match characters to their transcription.
+
+    Returns:
+        iterator of 2-tuples of scheme name and transcription
+    """
+    matrix = get_matrix(dialect)
+    return zip(matrix.schemes, matrix.row(char_re))
+
+def make_char(string, kind, dialect):
+    """Work out the metadata of a character from the standards.
+
+    Letters and punctuation are matched against the regexes of
+    the alphabet and punctuation standards, and their transcriptions
+    looked up by the regex that matched. Foreign letters have
+    no standard, so only their string and class are given.
+    """
+    if kind == 'foreign':
+        char_meta = {'class': 'foreign', 'decomposed_string': string}
+        char_meta.update(dict(match_transcriptions(string, dialect)))
+        return char_meta
+
+    char_meta = {}
+    char_meta.update(
+        get_metadata(string, char_metadata[kind])
+    )
+
+    # update with transcriptions
+    char_re = char_meta['decomposed_regex']
+    char_meta.update(
+        dict(match_transcriptions(char_re, dialect))
+    )
+
+    return char_meta
+
+def build_char_table(dialect):
+    """Build the records of all standard characters for a dialect.
+
+    Letters are entered under both their lower and upper case
+    strings, since the alphabet regexes match either.
+
+    Returns:
+        dict of (decomposed_string, kind) to FrozenDict
+    """
+    strings = []
+    for letter in alphabet_data:
+        strings.append((letter['decomposed_string'], 'letter'))
+        strings.append((letter['decomposed_upper_string'], 'letter'))
+    for punct in punct_data:
+        strings.append((punct['decomposed_string'], 'punctuation'))
+    return {
+        (string, kind): FrozenDict(make_char(string, kind, dialect))
+            for string, kind in strings
+    }
+
+# build the character tables for all known dialects, or load them
+# from the standards bundle; characters outside of the standards
+# are added as they are met
+dialect2chars = load_section('characters', lambda: {
+    dialect['code']: build_char_table(dialect['code'])
+        for dialect in dialect_data
+})
+
+def build_char(string, kind, dialect):
+    """Construct metadata for a matching letter.
+
+    Arguments:
+        string (str): decomposed string of the character
+        kind (str): 'letter', 'punctuation' or 'foreign'
+        dialect (str): dialect of the text
+
+    Returns:
+        FrozenDict shared by all characters with the same
+        string, kind and dialect
+    """
+    try:
+        return dialect2chars[dialect][(string, kind)]
+    except KeyError:
+        pass
+
+    # sanity check on dialect
+    if dialect == None:
+        raise Exception('Dialect not properly delineated in metadata block!')
+
+    char_table = dialect2chars.setdefault(dialect, {})
+    char_meta = FrozenDict(make_char(string, kind, dialect))
+    char_table[(string, kind)] = char_meta
+    return char_meta
@@ -0,0 +1,319 @@
+"""
+Columnar binary format of the parsed NENA corpus.
+
+The JSON formats (see formats.py) hold a tree of dicts per word, which
+must all be built by json.load before any question about the corpus
+can be answered. This format stores each dialect of a corpus as a set
+of flat arrays of fixed-size integers, one file per array, which are
+memory-mapped on loading: opening a corpus only reads a small index,
+and the pages of an array are read by the operating system once they
+are used.
+
+    parsed_texts/alpha_columns/
+        Barwar/
+            index.json
+            letters.bin
+            word_letters.bin
+            ...
+        Urmi_C/
+            ...
+
+index.json holds the tables that the arrays refer to by id: the
+character records, lemmas, speaker initials and language codes of
+the dialect, along with the titles and metadata of its texts and the type and
+length of each array. Arrays are little-endian, and are one of:
+
+    value arrays: one value per item, e.g. `letters` is the id in
+        the character table of every letter of every word, one word
+        after the other
+    offset arrays: one more item than the things they divide, where
+        thing i covers the range offsets[i]:offsets[i+1], e.g. the
+        letters of word i are letters[word_letters[i]:word_letters[i+1]]
+
+The arrays of a dialect are:
+
+    letters, beginnings, endings (u4): character ids
+    word_letters, word_beginnings, word_endings (u4): offsets of each
+        word into the above
+    lemmas (u4): lemma ids of the parsings of each word
+    word_lemmas (u4): offsets of each word into lemmas
+    word_speaker, word_lang (i4): speaker and language id of each
+        word, or -1 if none is given
+    paragraph_words, line_words, text_words (u4): offsets of each
+        paragraph, line and text into the words
+    text_paragraphs (u4): offsets of each text into the paragraphs
+    line_numbers (u4): number of each line, 0 for words of a text
+        that come before its first line number
+
+The arrays are written with the standard library; loading them
+needs NumPy.
+"""
+
+import sys
+import json
+import mmap
+import array
+import argparse
+from pathlib import Path
+
+from formats import Corpus
+
+PROJECT = Path(__file__).resolve().parent.parent
+VERSION = 'alpha'
+COLUMNS_VERSION = 1
+INDEX_FILE = 'index.json'
+
+# NumPy dtype and array typecode of each kind of column
+DTYPES = {
+    'u4': ('<u4', 'I'),
+    'i4': ('<i4', 'i'),
+}
+
+COLUMNS = {
+    'letters': 'u4',
+    'word_letters': 'u4',
+    'beginnings': 'u4',
+    'word_beginnings': 'u4',
+    'endings': 'u4',
+    'word_endings': 'u4',
+    'lemmas': 'u4',
+    'word_lemmas': 'u4',
+    'word_speaker': 'i4',
+    'word_lang': 'i4',
+    'paragraph_words': 'u4',
+    'line_words': 'u4',
+    'line_numbers': 'u4',
+    'text_words': 'u4',
+    'text_paragraphs': 'u4',
+}
+
+# columns of offsets, which start at 0
+OFFSETS = {
+    'word_letters', 'word_beginnings', 'word_endings', 'word_lemmas',
+    'paragraph_words', 'text_words', 'text_paragraphs',
+}
+
+class Table:
+    """Table of unique values, indexed by integer id."""
+
+    def __init__(self):
+        self.values = []
+        self._key2id = {}
+
+    def add(self, value, key=None):
+        """Get the id of a value, adding it if new."""
+        key = value if key is None else key
+        value_id = self._key2id.get(key)
+        if value_id is None:
+            value_id = self._key2id[key] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+class DialectWriter:
+    """Collects the columns of the texts of one dialect."""
+
+    def __init__(self):
+        self.columns = {
+            name: array.array(DTYPES[kind][1]) for name, kind in COLUMNS.items()
+        }
+        for name in OFFSETS:
+            self.columns[name].append(0)
+        # lines are ended when the next one starts,
+        # so only their starts are kept until writing
+        self.line_starts = []
+        self.chars = Table()
+        self.lemmas = Table()
+        self.speakers = Table()
+        self.langs = Table()
+        self.texts = []
+
+    @property
+    def nwords(self):
+        return len(self.columns['word_speaker'])
+
+    def start_line(self, number):
+        """Start a new line at the next word.
+
+        A line without any words is dropped.
+        """
+        if self.line_starts and self.line_starts[-1] == self.nwords:
+            self.line_starts.pop()
+            self.columns['line_numbers'].pop()
+        self.line_starts.append(self.nwords)
+        self.columns['line_numbers'].append(number)
+
+    def add_text(self, parsed, title, get_parsings=None):
+        """Add the columns of a text in the parser's output shape.
+
+        Arguments:
+            parsed (list): [metadata, text_block] of the text
+            title (str): title of the text
+            get_parsings (callable): gets the parsing records of
+                a word, e.g. Corpus.get_parsings; by default, they
+                are taken from the word as they are
+        """
+        metadata, text_block = parsed
+        cols = self.columns
+        chars = self.chars
+        speaker = lang = -1
+        self.start_line(0)
+
+        for paragraph in text_block:
+            for element in paragraph:
+                if element.get('class') != 'word':
+                    if 'line_number' in element:
+                        self.start_line(int(element['line_number']))
+                    if 'speaker' in element:
+                        speaker = self.speakers.add(element['speaker'])
+                    continue
+
+                for key in ('letters', 'beginnings', 'endings'):
+                    cols[key].extend(
+                        chars.add(char, key=tuple(char.items()))
+                            for char in element[key]
+                    )
+                    cols[f'word_{key}'].append(len(cols[key]))
+                parsings = get_parsings(element) if get_parsings else element['parsings']
+                cols['lemmas'].extend(
+                    self.lemmas.add(parsing.get('lemma')) for parsing in parsings
+                )
+                cols['word_lemmas'].append(len(cols['lemmas']))
+
+                # a language span covers the words from
+                # its LANG_START up to its LANG_END
+                for char in element['beginnings']:
+                    if char.get('class') == 'LANG_START':
+                        lang = self.langs.add(char['lang'])
+                cols['word_speaker'].append(speaker)
+                cols['word_lang'].append(lang)
+                for char in element['endings']:
+                    if char.get('class') == 'LANG_END':
+                        lang = -1
+
+            cols['paragraph_words'].append(self.nwords)
+
+        cols['text_words'].append(self.nwords)
+        cols['text_paragraphs'].append(len(cols['paragraph_words']) - 1)
+        self.texts.append({'title': title, 'metadata': metadata})
+
+    def write(self, outdir):
+        """Write the columns and their index to a directory."""
+        outdir.mkdir(parents=True, exist_ok=True)
+        cols = self.columns
+        if self.line_starts and self.line_starts[-1] == self.nwords:
+            self.line_starts.pop()
+            cols['line_numbers'].pop()
+        cols['line_words'] = array.array(DTYPES['u4'][1], self.line_starts + [self.nwords])
+
+        index = {
+            'format': COLUMNS_VERSION,
+            'columns': {},
+            'chars': self.chars.values,
+            'lemmas': self.lemmas.values,
+            'speakers': self.speakers.values,
+            'langs': self.langs.values,
+            'texts': self.texts,
+        }
+        for name, kind in COLUMNS.items():
+            column = cols[name]
+            if sys.byteorder == 'big':
+                column = array.array(column.typecode, column)
+                column.byteswap()
+            with open(outdir.joinpath(f'{name}.bin'), 'wb') as outfile:
+                column.tofile(outfile)
+            index['columns'][name] = [kind, len(column)]
+        with open(outdir.joinpath(INDEX_FILE), 'w') as outfile:
+            json.dump(index, outfile, ensure_ascii=False, indent=1)
+
+def write_columns(corpus, outdir):
+    """Write a parsed corpus in the columnar format.
+
+    Arguments:
+        corpus (formats.Corpus): parsed corpus, in any format version
+        outdir (pathlib.Path): directory to write a subdirectory
+            of columns per dialect to
+    """
+    dialect2texts = {}
+    for dialect, title in corpus.texts():
+        dialect2texts.setdefault(dialect, []).append(title)
+    for dialect, titles in dialect2texts.items():
+        writer = DialectWriter()
+        for title in titles:
+            parsed = corpus.read(dialect, title)
+            writer.add_text(parsed, title, get_parsings=corpus.get_parsings)
+        writer.write(outdir.joinpath(dialect))
+
+class Columns:
+    """Memory-mapped columns of one dialect.
+
+    Columns are attributes, e.g. `columns.letters`, holding a
+    read-only NumPy array that is mapped on first use. The tables
+    of the index are attributes as well, e.g. `columns.chars`, but
+    the lemma table is `columns.lemma_table`, since `lemmas` is a
+    column.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path.joinpath(INDEX_FILE), 'r') as infile:
+            self.index = json.load(infile)
+        if self.index.get('format') != COLUMNS_VERSION:
+            raise Exception(f'unknown columns format {self.index.get("format")} in {self.path}')
+        self.chars = self.index['chars']
+        self.lemma_table = self.index['lemmas']
+        self.speakers = self.index['speakers']
+        self.langs = self.index['langs']
+        self.texts = self.index['texts']
+
+    def __getattr__(self, name):
+        # only called for columns, which are not mapped yet
+        if name not in COLUMNS:
+            raise AttributeError(name)
+        column = self.load(name)
+        setattr(self, name, column)
+        return column
+
+    def load(self, name):
+        """Map a column file into a read-only NumPy array."""
+        import numpy
+        kind, length = self.index['columns'][name]
+        dtype = DTYPES[kind][0]
+        if not length:
+            return numpy.empty(0, dtype=dtype)
+        with open(self.path.joinpath(f'{name}.bin'), 'rb') as infile:
+            buffer = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        return numpy.frombuffer(buffer, dtype=dtype, count=length)
+
+    def word_string(self, word):
+        """Get the string of a word by its index."""
+        letters = self.letters[self.word_letters[word]:self.word_letters[word+1]]
+        return ''.join(self.chars[i]['decomposed_string'] for i in letters)
+
+    def text_range(self, text):
+        """Get the range of word indices of a text by its index."""
+        return range(self.text_words[text], self.text_words[text+1])
+
+def load_columns(path):
+    """Open the columns of all dialects in a directory.
+
+    Returns:
+        dict of dialect to Columns
+    """
+    return {
+        index.parent.name: Columns(index.parent)
+            for index in sorted(Path(path).glob(f'*/{INDEX_FILE}'))
+    }
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Write the parsed NENA corpus as columns.')
+    argparser.add_argument('indir', nargs='?', type=Path,
+                           default=PROJECT.joinpath('parsed_texts', VERSION),
+                           help='directory of the parsed corpus, in any format')
+    argparser.add_argument('outdir', nargs='?', type=Path,
+                           default=PROJECT.joinpath('parsed_texts', f'{VERSION}_columns'),
+                           help='directory to write the columns to')
+    args = argparser.parse_args(argv)
+    write_columns(Corpus(args.indir), args.outdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Keyword-in-context (KWIC) concordance of a parsed corpus.
+
+Run instructions:
+    python concordance.py [--corpus DIR] (--form FORM | --lemma LEMMA)
+                          [--sort {corpus,left,right,keyword}]
+                          [--width N] [--page N] [--size N] [--paragraph]
+
+The concordance keeps the words of the corpus as a flat list of their
+printed strings, e.g. '⁺ʾal-', one text after the other, along with
+the offsets of the texts, paragraphs and lines in that list. A hit is
+the index of a word in the list, so its context is a slice of the
+list, and nothing else of the text needs to be read.
+
+Hits are found by surface form, with an index of the forms of the
+words, or by lemma, with the index of word_index.py, which numbers
+the words in the same way. A page of results is made by picking out
+only the hits on that page, with heapq when they are sorted, and
+only the lines of that page are put together.
+
+The concordance is kept as concordance.json in the corpus directory,
+and is built again when a text of the corpus changed after it was
+written.
+"""
+
+import json
+import heapq
+import unicodedata
+import bisect
+import argparse
+from pathlib import Path
+
+from formats import Corpus
+from word_index import open_index, is_current, QueryError
+
+PROJECT = Path(__file__).resolve().parent.parent
+VERSION = 'alpha'
+CONCORDANCE_VERSION = 1
+CONCORDANCE_FILE = 'concordance.json'
+
+SORTS = ('corpus', 'left', 'right', 'keyword')
+
+class Concordance:
+    """Words of a corpus with their text, paragraph and line offsets."""
+
+    def __init__(self, data, path=None):
+        self.path = path
+        self.texts = [f'{dialect}/{title}' for dialect, title in data['texts']]
+        self.words = data['words']
+        self.forms = data['forms']
+        self.text_words = data['text_words']
+        self.paragraph_words = data['paragraph_words']
+        self.line_words = data['line_words']
+        self.line_numbers = data['line_numbers']
+        self._word_index = None
+
+    def find(self, form=None, lemma=None):
+        """Get the hits of a surface form or lemma, in corpus order.
+
+        Forms are matched in their decomposed (NFD) form, like
+        the strings of parsed words.
+
+        Returns:
+            list of word indices
+        """
+        if form is not None:
+            return list(self.forms.get(unicodedata.normalize('NFD', form), []))
+        if lemma is not None:
+            if self._word_index is None:
+                self._word_index = open_index(self.path)
+            return list(self._word_index.term('lemma', lemma))
+        raise Exception('a form or a lemma is needed to find hits')
+
+    def bounds(self, word, within='text'):
+        """Get the first and last word of the text or paragraph of a word."""
+        offsets = self.paragraph_words if within == 'paragraph' else self.text_words
+        i = bisect.bisect_right(offsets, word) - 1
+        end = offsets[i+1] if i + 1 < len(offsets) else len(self.words)
+        return offsets[i], end
+
+    def left(self, word, width, within='text'):
+        """Get up to width words before a word."""
+        start, end = self.bounds(word, within)
+        return self.words[max(start, word - width):word]
+
+    def right(self, word, width, within='text'):
+        """Get up to width words after a word."""
+        start, end = self.bounds(word, within)
+        return self.words[word+1:min(end, word + 1 + width)]
+
+    def sort_key(self, sort, width, within):
+        """Get the sort key function of a sort order."""
+        if sort == 'corpus':
+            return None
+        if sort == 'keyword':
+            return lambda word: (self.words[word], word)
+        if sort == 'right':
+            return lambda word: (self.right(word, width, within), word)
+        if sort == 'left':
+            return lambda word: (self.left(word, width, within)[::-1], word)
+        raise Exception(f'unknown sort order {sort}; choose from {SORTS}')
+
+    def page(self, hits, page=1, size=20, sort='corpus', width=5, within='text'):
+        """Make one page of KWIC lines of a list of hits.
+
+        Only the hits up to the end of the page are ordered, and only
+        the lines on the page are made.
+
+        Arguments:
+            hits (list): word indices, in corpus order
+            page (int): page number, from 1
+            size (int): number of lines per page
+            sort (str): order of the lines, one of SORTS: by place in
+                the corpus, by the words to the left of the hit, read
+                from right to left, by the words to the right, or by
+                the hit itself
+            width (int): number of words of context on each side,
+                also used for sorting
+            within (str): 'text' or 'paragraph'; context is not
+                taken from outside of it
+
+        Returns:
+            list of dicts with text, line_number, left, keyword, right
+        """
+        first = (page - 1) * size
+        key = self.sort_key(sort, width, within)
+        if key is None:
+            words = hits[first:first + size]
+        else:
+            words = heapq.nsmallest(first + size, hits, key=key)[first:]
+        return [self.line(word, width, within) for word in words]
+
+    def line(self, word, width=5, within='text'):
+        """Make the KWIC line of a hit."""
+        text = bisect.bisect_right(self.text_words, word) - 1
+        line = bisect.bisect_right(self.line_words, word) - 1
+        # words before the first line indicator of a text have no line
+        if line >= 0 and self.line_words[line] < self.text_words[text]:
+            line = -1
+        return {
+            'text': self.texts[text],
+            'line_number': self.line_numbers[line] if line >= 0 else None,
+            'left': ' '.join(self.left(word, width, within)),
+            'keyword': self.words[word],
+            'right': ' '.join(self.right(word, width, within)),
+        }
+
+def word_string(word):
+    """Get a word as it is printed, with its punctuation."""
+    return ''.join([
+        *(c['decomposed_string'] for c in word['beginnings']),
+        word['string'],
+        *(c['decomposed_string'] for c in word['endings']),
+    ]).strip()
+
+def build_concordance(corpus):
+    """Build the concordance data of a parsed corpus.
+
+    Arguments:
+        corpus (formats.Corpus): parsed corpus, in any format version
+
+    Returns:
+        dict as stored in concordance.json
+    """
+    texts = corpus.texts()
+    data = {
+        'format': CONCORDANCE_VERSION,
+        'texts': texts,
+        'words': [],
+        'forms': {},
+        'text_words': [],
+        'paragraph_words': [],
+        'line_words': [],
+        'line_numbers': [],
+    }
+    words = data['words']
+    for dialect, title in texts:
+        data['text_words'].append(len(words))
+        metadata, text_block = corpus.read(dialect, title)
+        for paragraph in text_block:
+            data['paragraph_words'].append(len(words))
+            for element in paragraph:
+                if element.get('class') != 'word':
+                    if 'line_number' in element:
+                        # a line without words is replaced by the next
+                        if data['line_words'] and data['line_words'][-1] == len(words):
+                            data['line_words'].pop()
+                            data['line_numbers'].pop()
+                        data['line_words'].append(len(words))
+                        data['line_numbers'].append(int(element['line_number']))
+                    continue
+                data['forms'].setdefault(element['string'], []).append(len(words))
+                words.append(word_string(element))
+    return data
+
+def open_concordance(path, rebuild=False):
+    """Open the concordance of a parsed corpus, building it if needed.
+
+    Arguments:
+        path (str or pathlib.Path): directory of the parsed corpus
+        rebuild (bool): if True, build the concordance even if it is current
+
+    Returns:
+        Concordance
+    """
+    corpus = Corpus(path)
+    concordance_file = corpus.path.joinpath(CONCORDANCE_FILE)
+    data = None
+    if not rebuild and is_current(concordance_file, corpus):
+        with open(concordance_file, 'r') as infile:
+            data = json.load(infile)
+        if data.get('format') != CONCORDANCE_VERSION or data['texts'] != [list(t) for t in corpus.texts()]:
+            data = None
+    if data is None:
+        data = build_concordance(corpus)
+        with open(concordance_file, 'w') as outfile:
+            json.dump(data, outfile, ensure_ascii=False, separators=(',', ':'))
+    return Concordance(data, corpus.path)
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Show a KWIC concordance of the parsed NENA corpus.')
+    search = argparser.add_mutually_exclusive_group(required=True)
+    search.add_argument('--form', help='surface form of the word, e.g. xá')
+    search.add_argument('--lemma', help='lemma of the word, e.g. xa')
+    argparser.add_argument('--corpus', type=Path,
+                           default=PROJECT.joinpath('parsed_texts', VERSION),
+                           help='directory of the parsed corpus')
+    argparser.add_argument('--sort', choices=SORTS, default='corpus',
+                           help='order of the lines')
+    argparser.add_argument('--width', type=int, default=5,
+                           help='number of words of context on each side')
+    argparser.add_argument('--page', type=int, default=1)
+    argparser.add_argument('--size', type=int, default=20,
+                           help='number of lines per page')
+    argparser.add_argument('--paragraph', action='store_true',
+                           help='only take context from the paragraph of a hit')
+    args = argparser.parse_args(argv)
+
+    concordance = open_concordance(args.corpus)
+    try:
+        hits = concordance.find(form=args.form, lemma=args.lemma)
+    except QueryError as error:
+        argparser.error(str(error))
+    within = 'paragraph' if args.paragraph else 'text'
+    lines = concordance.page(hits, page=args.page, size=args.size,
+                             sort=args.sort, width=args.width, within=within)
+    print(f'{len(hits)} hits, page {args.page}')
+    for line in lines:
+        print(f"{line['left']:>50}  {line['keyword']}  {line['right']:<50}"
+              f"  {line['text']}:{line['line_number']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Compact objects for the words and spans of a parsed text.
+
+By default the parser gives each element of a paragraph as a dict:
+
+    {"class": "span", "line_number": "1"}
+    {"class": "word", "string": "xá", "letters": [...],
+     "beginnings": [...], "endings": [...], "parsings": [...]}
+
+With NenaParser(dialect, objects=True), they are Word and Span
+objects instead. These have __slots__ rather than a dict per element,
+and hold their characters in tuples instead of lists. The character
+records themselves are the shared records of characters.py, and the
+parsings the shared records of lexicon.py, so a word adds little
+more than its string and the tuples that point at them.
+
+Elements can be read like the dicts: element['string'],
+element.get('class') and dict(element) all work, so code written
+for dicts can read them as they are. They are read-only. `to_dict`
+turns an element into the dict the parser would have given, and
+`to_json` does the same for json.dumps(..., default=to_json), which
+gives the same JSON as for a text of dicts.
+"""
+
+class Element:
+    """Read-only element of a paragraph, that can be read like a dict."""
+
+    __slots__ = ()
+
+    def keys(self):
+        return ('class', *self.fields())
+
+    def fields(self):
+        """Names of the values of the element, without 'class'."""
+        return self.__slots__
+
+    def __getitem__(self, key):
+        if key == 'class':
+            return self.element_class
+        if key in self.fields():
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key == 'class' or key in self.fields()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Element, dict)):
+            return self.to_dict() == to_dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __setattr__(self, name, value):
+        raise TypeError(f'{self.__class__.__name__} is read-only')
+
+    def __reduce__(self):
+        return (self.__class__, tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.to_dict()!r})'
+
+    # fields held as tuples that the parser gives as lists
+    list_fields = ()
+
+    def to_dict(self):
+        """Get the element as the dict given by the parser."""
+        data = {'class': self.element_class}
+        for key in self.fields():
+            value = getattr(self, key)
+            data[key] = list(value) if key in self.list_fields else value
+        return data
+
+class Word(Element):
+    """Word with the records of its characters and its parsings."""
+
+    __slots__ = ('string', 'letters', 'beginnings', 'endings', 'parsings')
+    element_class = 'word'
+    list_fields = ('letters', 'beginnings', 'endings')
+
+    def __init__(self, string, letters, beginnings, endings, parsings):
+        set_value = object.__setattr__
+        set_value(self, 'string', string)
+        set_value(self, 'letters', tuple(letters))
+        set_value(self, 'beginnings', tuple(beginnings))
+        set_value(self, 'endings', tuple(endings))
+        # shared by all words of the same form, see lexicon.py
+        set_value(self, 'parsings', parsings)
+
+# the fields of spans, in the orders they are given in,
+# so that spans with the same fields share one tuple
+field_orders = {}
+
+class Span(Element):
+    """Span tag, such as a line number or speaker."""
+
+    __slots__ = ('timestamp', 'line_number', 'speaker', 'order')
+    element_class = 'span'
+
+    def __init__(self, timestamp=None, line_number=None, speaker=None, order=None):
+        set_value = object.__setattr__
+        set_value(self, 'timestamp', timestamp)
+        set_value(self, 'line_number', line_number)
+        set_value(self, 'speaker', speaker)
+        if order is None:
+            order = tuple(
+                name for name, value in
+                    (('timestamp', timestamp), ('line_number', line_number), ('speaker', speaker))
+                        if value is not None
+            )
+        set_value(self, 'order', field_orders.setdefault(order, order))
+
+    @classmethod
+    def from_dict(cls, attribs):
+        """Make a span from the dict of a SPAN_TAG token."""
+        fields = tuple(key for key in attribs if key != 'class')
+        return cls(**{key: attribs[key] for key in fields}, order=fields)
+
+    def fields(self):
+        return self.order
+
+def to_dict(element):
+    """Get an element as a dict, whether it is an object or a dict already."""
+    if isinstance(element, Element):
+        return element.to_dict()
+    return element
+
+def to_json(obj):
+    """Encode elements for json.dumps, as its `default` argument."""
+    if isinstance(obj, Element):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
@@ -0,0 +1,330 @@
+"""
+Output formats for parsed NENA texts.
+
+The parser returns a text as a list of [metadata, text_block], where
+text_block is a list of paragraphs, and each paragraph a list of spans
+and words. Every word holds the full metadata record of each of its
+letters, beginnings and endings. Written out as is (format version 1),
+the same few dozen character records are repeated for every letter in
+the corpus.
+
+Format version 2 stores each character record once per text, in a
+character table, and words refer to their characters by their integer
+position in that table:
+
+    {
+        "format": 2,
+        "metadata": {...},
+        "chars": [{...}, {...}, ...],
+        "text": [ # paragraphs
+            [ # elements
+                {"class": "span", "line_number": "1"},
+                {"class": "word", "string": "xá",
+                 "letters": [0, 1], "beginnings": [], "endings": [2],
+                 "parsings": [...]},
+            ],
+        ],
+    }
+
+Format version 3 goes one step further for the lexicon data. The
+parsing records of all texts in a corpus are stored once, in a
+parsings.json file at the top of the corpus directory, and the
+"parsings" of each word is a list of ids into that table:
+
+    parsed_texts/<version>/
+        parsings.json
+        Barwar/<title>.json
+        Urmi_C/<title>.json
+
+`read_text` accepts any version and returns the version 1 shape,
+unless asked to leave a text compact. `Corpus` reads a whole corpus
+directory, and only loads the parsings table once a parsing is asked
+for.
+"""
+
+import json
+from pathlib import Path
+
+from elements import to_dict, to_json
+
+FORMAT_VERSION = 2
+PARSINGS_VERSION = 3
+PARSINGS_FILE = 'parsings.json'
+
+# keys of a word that hold lists of characters
+CHAR_KEYS = ('letters', 'beginnings', 'endings')
+
+class CharTable:
+    """Table of unique character records, indexed by integer id."""
+
+    def __init__(self, chars=None):
+        self.chars = []
+        self._key2id = {}
+        self._obj2id = {}
+        for char in chars or []:
+            self.add(char)
+
+    def add(self, char):
+        """Get the id of a character record, adding it if new."""
+        # shared records are looked up by identity first,
+        # which avoids building a content key for every letter
+        try:
+            return self._obj2id[id(char)][0]
+        except KeyError:
+            pass
+        key = tuple(char.items())
+        char_id = self._key2id.get(key)
+        if char_id is None:
+            char_id = self._key2id[key] = len(self.chars)
+            self.chars.append(char)
+        # the record is kept along with its id so that
+        # its id() cannot be reused by another object
+        self._obj2id[id(char)] = (char_id, char)
+        return char_id
+
+class ParsingTable:
+    """Table of unique parsing records of a corpus, indexed by integer id.
+
+    Records are looked up by their contents, and a copy is stored,
+    so that the table is not affected by later changes to a record.
+    """
+
+    def __init__(self, parsings=None):
+        self.parsings = []
+        self._key2id = {}
+        for parsing in parsings or []:
+            self.add(parsing)
+
+    def add(self, parsing):
+        """Get the id of a parsing record, adding it if new."""
+        # values can be lists, so the key is the record's JSON
+        key = json.dumps(parsing, sort_keys=True, ensure_ascii=False)
+        parsing_id = self._key2id.get(key)
+        if parsing_id is None:
+            parsing_id = self._key2id[key] = len(self.parsings)
+            self.parsings.append(dict(parsing))
+        return parsing_id
+
+def compact_text(parsed, parsings=None):
+    """Convert a parsed text to format version 2 or 3.
+
+    Arguments:
+        parsed (list): [metadata, text_block] as returned by NenaParser
+        parsings (ParsingTable): corpus table for the parsing records;
+            if given, words refer to their parsings by id, and
+            the text is in format version 3
+
+    Returns:
+        dict with the metadata, character table and text
+    """
+    metadata, text_block = parsed
+    table = CharTable()
+    text = []
+    for paragraph in text_block:
+        elements = []
+        for element in paragraph:
+            if element.get('class') == 'word':
+                element = dict(element)
+                for key in CHAR_KEYS:
+                    element[key] = [table.add(char) for char in element[key]]
+            else:
+                element = to_dict(element)
+            elements.append(element)
+        text.append(elements)
+    compact = {
+        'format': FORMAT_VERSION,
+        'metadata': metadata,
+        'chars': table.chars,
+        'text': text,
+    }
+    if parsings is not None:
+        add_parsings(compact, parsings)
+    return compact
+
+def add_parsings(compact, parsings):
+    """Move the parsings of a version 2 text into a corpus table.
+
+    The text is changed in place to format version 3.
+
+    Arguments:
+        compact (dict): text in format version 2
+        parsings (ParsingTable): table of the corpus
+    """
+    for paragraph in compact['text']:
+        for element in paragraph:
+            if element.get('class') == 'word':
+                element['parsings'] = [parsings.add(p) for p in element['parsings']]
+    compact['format'] = PARSINGS_VERSION
+
+def expand_text(compact, parsings=None):
+    """Convert a compact text back to the parser's output shape.
+
+    Character records are shared between all of the letters
+    that refer to them; copy them before making changes.
+
+    Arguments:
+        compact (dict): text in format version 2 or 3
+        parsings (list): parsing records of the corpus; if given,
+            the parsing ids of a version 3 text are replaced by
+            their records, otherwise they are left as ids
+
+    Returns:
+        list of [metadata, text_block]
+    """
+    chars = compact['chars']
+    resolve = parsings is not None and compact['format'] == PARSINGS_VERSION
+    text_block = []
+    for paragraph in compact['text']:
+        elements = []
+        for element in paragraph:
+            if element.get('class') == 'word':
+                element = dict(element)
+                for key in CHAR_KEYS:
+                    element[key] = [chars[i] for i in element[key]]
+                if resolve:
+                    element['parsings'] = [parsings[i] for i in element['parsings']]
+            elements.append(element)
+        text_block.append(elements)
+    return [compact['metadata'], text_block]
+
+def encode_text(parsed, version=FORMAT_VERSION, parsings=None):
+    """Encode a parsed text as the JSON string of a format version.
+
+    Version 1 is indented for easy inspection, as has always been
+    done. Versions 2 and 3 have no whitespace, since they are meant
+    to be read with read_text. Version 3 needs the ParsingTable of
+    the corpus, which is to be written with write_parsings once all
+    texts are written. The words and spans of the text can be dicts
+    or the objects of elements.py; both give the same JSON.
+    """
+    if version == 1:
+        return json.dumps(parsed, ensure_ascii=False, indent=2, default=to_json)
+    elif version in {FORMAT_VERSION, PARSINGS_VERSION}:
+        if (version == PARSINGS_VERSION) != (parsings is not None):
+            raise Exception(f'a parsings table is needed for, and only for, version {PARSINGS_VERSION}')
+        return encode_compact(compact_text(parsed, parsings))
+    else:
+        raise Exception(f'unknown format version {version}')
+
+def encode_block(block):
+    """Encode the attributes or a paragraph of a text for join_blocks."""
+    return json.dumps(block, ensure_ascii=False, indent=2, default=to_json)
+
+def join_blocks(attributes, paragraphs):
+    """Join encoded blocks into the version 1 JSON string of a text.
+
+    This gives the same string as encode_text with version 1, from
+    the blocks encoded with encode_block, so that a text can be
+    encoded again without encoding the blocks that did not change.
+
+    Arguments:
+        attributes (str): the encoded attributes of the text
+        paragraphs (list): the encoded paragraphs of the text
+    """
+    # the blocks are nested one and two levels down,
+    # which only adds to the indent of each of their lines
+    return ''.join([
+        '[\n  ', attributes.replace('\n', '\n  '), ',\n  [\n    ',
+        ',\n    '.join(p.replace('\n', '\n    ') for p in paragraphs),
+        '\n  ]\n]',
+    ])
+
+def encode_compact(compact):
+    """Encode a text in format version 2 or 3 as a JSON string."""
+    return json.dumps(compact, ensure_ascii=False, separators=(',', ':'))
+
+def write_text(parsed, path, version=FORMAT_VERSION, parsings=None):
+    """Write a parsed text to a JSON file, see encode_text."""
+    data = encode_text(parsed, version, parsings)
+    with open(path, 'w') as outfile:
+        outfile.write(data)
+
+def write_compact(compact, path):
+    """Write a text in format version 2 or 3 to a JSON file."""
+    data = encode_compact(compact)
+    with open(path, 'w') as outfile:
+        outfile.write(data)
+
+def write_parsings(parsings, path):
+    """Write the ParsingTable of a corpus to a JSON file."""
+    with open(path, 'w') as outfile:
+        json.dump(parsings.parsings, outfile, ensure_ascii=False, indent=1)
+
+def read_parsings(path):
+    """Read the parsing records of a corpus from a JSON file."""
+    with open(path, 'r') as infile:
+        return json.load(infile)
+
+def read_text(path, expand=True, parsings=None):
+    """Read a parsed text from a JSON file of any format version.
+
+    Arguments:
+        path (str or pathlib.Path): JSON file to read
+        expand (bool): if True, compact texts are expanded to
+            the parser's output shape; otherwise they are returned
+            as they are stored
+        parsings (list): parsing records of the corpus, used to
+            resolve the parsing ids of an expanded version 3 text
+
+    Returns:
+        list of [metadata, text_block], or for an unexpanded
+        compact text, the dict described in the module docs
+    """
+    with open(path, 'r') as infile:
+        data = json.load(infile)
+    if isinstance(data, list):
+        return data
+    if data.get('format') not in {FORMAT_VERSION, PARSINGS_VERSION}:
+        raise Exception(f'unknown format version {data.get("format")} in {path}')
+    return expand_text(data, parsings) if expand else data
+
+class Corpus:
+    """Reader for a directory of parsed texts.
+
+    The directory holds a subdirectory of JSON files per dialect,
+    in any format version. Texts are read one at a time, on request.
+    Parsing ids of version 3 texts are left as they are, and resolved
+    with `get_parsings`; the parsings table is only read from disk the
+    first time this is done.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._parsings = None
+
+    def texts(self):
+        """List the texts of the corpus as (dialect, title) tuples."""
+        return [
+            (file.parent.name, file.stem)
+                for file in sorted(self.path.glob('*/*.json'))
+        ]
+
+    def read(self, dialect, title, resolve=False):
+        """Read a text in the parser's output shape.
+
+        Arguments:
+            dialect (str): dialect subdirectory of the text
+            title (str): title of the text, i.e. its file name
+            resolve (bool): if True, parsing ids are replaced
+                by their records straight away
+
+        Returns:
+            list of [metadata, text_block]
+        """
+        file = self.path.joinpath(dialect, f'{title}.json')
+        parsings = self.parsings if resolve else None
+        return read_text(file, parsings=parsings)
+
+    @property
+    def parsings(self):
+        """Parsing records of the corpus, read on first use."""
+        if self._parsings is None:
+            self._parsings = read_parsings(self.path.joinpath(PARSINGS_FILE))
+        return self._parsings
+
+    def get_parsings(self, word):
+        """Get the parsing records of a word of any format version."""
+        return [
+            self.parsings[p] if isinstance(p, int) else p
+                for p in word['parsings']
+        ]
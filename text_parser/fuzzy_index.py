@@ -0,0 +1,291 @@
+"""
+Search index of the words of a parsed corpus by fuzzy transcription.
+
+Run instructions:
+    python fuzzy_index.py [--corpus DIR] [--dialect D]
+                          [--mode {exact,substring,similar}] [--distance N]
+                          QUERY
+
+Dialects with a fuzzy transcription, under standards/transcriptions,
+have a 'fuzzy' value for each letter, which leaves out accents and
+merges similar sounds, e.g. č, č̣ and č̭ are all '5'. The fuzzy key of
+a word is the fuzzy values of its letters joined together, and the
+index maps the keys of each dialect to the words that have them.
+
+A query is turned into a key in the same way, dialect by dialect,
+so it can be typed without accents or emphatics: 'xa' finds xá, xà
+and xa. Anything that is not a letter of the alphabet is kept as it
+is, lower-cased, so fuzzy values like '5' can be typed as well.
+
+Besides exact matches, keys can be searched for a substring of the
+query key, or for keys that are at most some number of edits away
+from it. For these, an index of the trigrams of all keys narrows down
+the keys that need to be checked. A query too short to have enough
+trigrams is checked against every key.
+
+Word ids and positions are those of word_index.py. The index is kept
+as fuzzy_index.json in the corpus directory, and is built again when
+a text of the corpus changed after it was written.
+"""
+
+import re
+import json
+import argparse
+import unicodedata
+from pathlib import Path
+
+from formats import Corpus
+from word_index import open_index, is_current
+from characters import alphabet_data, get_matrix
+
+PROJECT = Path(__file__).resolve().parent.parent
+VERSION = 'alpha'
+FUZZY_VERSION = 1
+FUZZY_FILE = 'fuzzy_index.json'
+SCHEME = 'fuzzy'
+GRAM = 3
+MODES = ('exact', 'substring', 'similar')
+
+# letters of the alphabet by their lower and upper case strings,
+# for turning queries into fuzzy keys
+string2regex = {
+    string: letter['decomposed_regex']
+        for letter in alphabet_data
+            for string in (letter['decomposed_string'], letter['decomposed_upper_string'])
+}
+grapheme_re = re.compile(r'[^\W\d_][\u0300-\u036f]*|.', re.DOTALL)
+
+def fuzzy_key(query, dialect):
+    """Turn a string into the fuzzy key of a dialect."""
+    matrix = get_matrix(dialect)
+    column = matrix.schemes.index(SCHEME)
+    key = []
+    for grapheme in grapheme_re.findall(unicodedata.normalize('NFD', query)):
+        regex = string2regex.get(grapheme)
+        if regex is not None:
+            key.append(matrix.row(regex)[column])
+        elif not grapheme.isspace():
+            key.append(grapheme.lower())
+    return ''.join(key)
+
+def grams(key, n=GRAM):
+    """Get the n-grams of a key, padded at both ends."""
+    padded = f'^{key}$'
+    return [padded[i:i+n] for i in range(len(padded) - n + 1)]
+
+def edit_distance(a, b, limit):
+    """Get the Levenshtein distance of two strings, or limit+1 if it is larger."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j-1] + 1,
+                previous[j-1] + (char_a != char_b),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+class DialectIndex:
+    """Fuzzy keys of the words of one dialect, with their trigrams."""
+
+    def __init__(self, dialect, keys):
+        self.dialect = dialect
+        self.keys = keys
+        self.key_list = list(keys)
+        self.gram2keys = {}
+        for i, key in enumerate(self.key_list):
+            for gram in set(grams(key)):
+                self.gram2keys.setdefault(gram, []).append(i)
+
+    def candidates(self, query_grams):
+        """Count the grams each key shares with a query."""
+        counts = {}
+        for gram in set(query_grams):
+            for i in self.gram2keys.get(gram, ()):
+                counts[i] = counts.get(i, 0) + 1
+        return counts
+
+    def search(self, query, mode='exact', distance=1):
+        """Find the keys that match a query.
+
+        Returns:
+            list of matching keys
+        """
+        key = fuzzy_key(query, self.dialect)
+        if not key:
+            return []
+        if mode == 'exact':
+            return [key] if key in self.keys else []
+        if mode == 'substring':
+            if len(key) < GRAM:
+                return [k for k in self.key_list if key in k]
+            # unpadded grams, since the query can be anywhere in a key
+            inner = [key[i:i+GRAM] for i in range(len(key) - GRAM + 1)]
+            counts = self.candidates(inner)
+            needed = len(set(inner))
+            return [
+                self.key_list[i] for i, count in counts.items()
+                    if count == needed and key in self.key_list[i]
+            ]
+        if mode == 'similar':
+            # a key within `distance` edits shares at least this many grams
+            query_grams = set(grams(key))
+            needed = len(query_grams) - GRAM * distance
+            if needed > 0:
+                counts = self.candidates(query_grams)
+                candidates = [i for i, count in counts.items() if count >= needed]
+            else:
+                candidates = range(len(self.key_list))
+            return [
+                self.key_list[i] for i in candidates
+                    if edit_distance(key, self.key_list[i], distance) <= distance
+            ]
+        raise Exception(f'unknown search mode {mode}; choose from {MODES}')
+
+class FuzzyIndex:
+    """Fuzzy keys of the words of a corpus, by dialect."""
+
+    def __init__(self, data, path=None):
+        self.path = path
+        self.dialects = {
+            dialect: DialectIndex(dialect, keys)
+                for dialect, keys in data['dialects'].items()
+        }
+        self.forms = data['forms']
+        self.corpus_dialects = {dialect for dialect, title in data['texts']}
+        self._word_index = None
+
+    def check_dialect(self, dialect):
+        """Raise an exception if a dialect cannot be searched."""
+        if dialect in self.dialects:
+            return
+        if dialect in self.corpus_dialects:
+            raise Exception(f'the words of dialect {dialect} have no {SCHEME} transcription')
+        raise Exception(f'no texts of dialect {dialect} in {self.path}; '
+                        f'choose from {sorted(self.dialects)}')
+
+    def search(self, query, dialect=None, mode='exact', distance=1):
+        """Find the words that match a query.
+
+        Arguments:
+            query (str): approximate form of a word
+            dialect (str): dialect to search; by default, all;
+                see check_dialect
+            mode (str): one of MODES: keys equal to the query key,
+                containing it, or at most `distance` edits away
+            distance (int): number of edits for 'similar'
+
+        Returns:
+            dict of (dialect, key) to sorted word ids
+        """
+        if dialect:
+            self.check_dialect(dialect)
+        dialects = [dialect] if dialect else list(self.dialects)
+        results = {}
+        for name in dialects:
+            index = self.dialects[name]
+            for key in sorted(index.search(query, mode, distance)):
+                results[(name, key)] = index.keys[key]
+        return results
+
+    def locate(self, word):
+        """Get the (text, line_number, position) of a word id."""
+        if self._word_index is None:
+            self._word_index = open_index(self.path)
+        return self._word_index.locate(word)
+
+def build_fuzzy_index(corpus):
+    """Build the fuzzy index data of a parsed corpus.
+
+    Arguments:
+        corpus (formats.Corpus): parsed corpus, in any format version
+
+    Returns:
+        dict as stored in fuzzy_index.json
+    """
+    texts = corpus.texts()
+    dialects = {}
+    forms = {}
+    word = 0
+    for dialect, title in texts:
+        metadata, text_block = corpus.read(dialect, title)
+        keys = dialects.setdefault(dialect, {})
+        for paragraph in text_block:
+            for element in paragraph:
+                if element.get('class') != 'word':
+                    continue
+                key = ''.join(letter.get(SCHEME, '') for letter in element['letters'])
+                if key:
+                    keys.setdefault(key, []).append(word)
+                    key_forms = forms.setdefault(dialect, {}).setdefault(key, [])
+                    if element['string'] not in key_forms:
+                        key_forms.append(element['string'])
+                word += 1
+    return {
+        'format': FUZZY_VERSION,
+        'texts': texts,
+        'dialects': {dialect: keys for dialect, keys in dialects.items() if keys},
+        'forms': forms,
+    }
+
+def open_fuzzy_index(path, rebuild=False):
+    """Open the fuzzy index of a parsed corpus, building it if needed.
+
+    Arguments:
+        path (str or pathlib.Path): directory of the parsed corpus
+        rebuild (bool): if True, build the index even if it is current
+
+    Returns:
+        FuzzyIndex
+    """
+    corpus = Corpus(path)
+    index_file = corpus.path.joinpath(FUZZY_FILE)
+    data = None
+    if not rebuild and is_current(index_file, corpus):
+        with open(index_file, 'r') as infile:
+            data = json.load(infile)
+        if data.get('format') != FUZZY_VERSION or data['texts'] != [list(t) for t in corpus.texts()]:
+            data = None
+    if data is None:
+        data = build_fuzzy_index(corpus)
+        with open(index_file, 'w') as outfile:
+            json.dump(data, outfile, ensure_ascii=False, separators=(',', ':'))
+    return FuzzyIndex(data, corpus.path)
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Search the parsed NENA corpus by fuzzy transcription.')
+    argparser.add_argument('query', help='approximate form of a word, e.g. xa')
+    argparser.add_argument('--corpus', type=Path,
+                           default=PROJECT.joinpath('parsed_texts', VERSION),
+                           help='directory of the parsed corpus')
+    argparser.add_argument('--dialect', help='dialect to search; by default, all')
+    argparser.add_argument('--mode', choices=MODES, default='exact')
+    argparser.add_argument('--distance', type=int, default=1,
+                           help='number of edits allowed in similar mode')
+    argparser.add_argument('--show', type=int, default=3,
+                           help='number of places to show per key')
+    args = argparser.parse_args(argv)
+
+    index = open_fuzzy_index(args.corpus)
+    if args.dialect:
+        try:
+            index.check_dialect(args.dialect)
+        except Exception as error:
+            argparser.error(str(error))
+    results = index.search(args.query, args.dialect, args.mode, args.distance)
+    print(f'{sum(len(words) for words in results.values())} words, {len(results)} keys')
+    for (dialect, key), words in results.items():
+        forms = ', '.join(index.forms[dialect][key])
+        print(f'{dialect}\t{key}\t{len(words)}\t{forms}')
+        for word in words[:args.show]:
+            text, line, position = index.locate(word)
+            print(f'\t{text}\tline {line}\tword {position}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+On-disk cache of the tables Sly builds for the NENA lexer and parser.
+
+Sly builds the lexer and parser when their classes are defined, i.e.
+every time nena_parser is imported, which happens in each worker
+process of a build. Most of that time goes to two things:
+
+    - the lexer compiles each token pattern on its own, to check that
+      it is valid and does not match the empty string, before
+      compiling the master pattern of all tokens
+    - the parser works out its LALR tables from the grammar
+
+The parser tables are plain dicts, and are stored in the cache under
+a hash of the grammar's productions. Compiled regexes cannot be
+stored, so for the lexer the cache keeps the token patterns that
+passed the checks, and those are not compiled again. The token
+patterns include the alphabet and punctuation regexes, so a change to
+the standards or the grammar simply misses the cache.
+
+The cache lives in text_parser/.cache and can be deleted at any time.
+If it cannot be read or written, everything is built as usual.
+"""
+
+import os
+import re
+import sys
+import json
+import pickle
+import hashlib
+import types
+from pathlib import Path
+
+import sly
+from sly.yacc import YaccError
+
+CACHE_DIR = Path(__file__).resolve().parent.joinpath('.cache')
+
+def cache_key(*parts):
+    """Hash the parts of a cache entry's inputs, along with
+    the versions of Sly and Python that the entry is built with."""
+    digest = hashlib.sha256()
+    for part in (sly.__version__, sys.version, *parts):
+        digest.update(repr(part).encode('utf8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+def cache_file(name, key, suffix):
+    return CACHE_DIR.joinpath(f'{name}-{key}{suffix}')
+
+def save_file(path, data):
+    """Write bytes to a file in one step, so that processes
+    building at the same time never read a partial file."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{path.name}.{os.getpid()}')
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+class CheckedPatterns:
+    """Stand-in for the re module while Sly builds a lexer.
+
+    Patterns that passed Sly's checks before are not compiled;
+    all others, including the master pattern, are.
+    """
+
+    def __init__(self, checked):
+        self.checked = checked
+        self.seen = set()
+
+    def compile(self, pattern, flags=0):
+        self.seen.add(pattern)
+        if pattern in self.checked:
+            return self
+        return re.compile(pattern, flags)
+
+    def match(self, string):
+        # a checked pattern does not match the empty string
+        return None
+
+def build_lexer(cls, build):
+    """Build a Sly lexer class with the cache.
+
+    Arguments:
+        cls (type): Lexer subclass being built
+        build (callable): Sly's own build method of the class
+    """
+    path = cache_file(cls.__name__, cache_key(cls.reflags), '.json')
+    try:
+        checked = set(json.loads(path.read_text()))
+    except (OSError, ValueError):
+        checked = set()
+
+    patterns = CheckedPatterns(checked)
+    cls.regex_module = patterns
+    try:
+        build()
+    finally:
+        cls.regex_module = re
+
+    # Sly raises an error for a pattern that fails its checks,
+    # so at this point all token patterns have passed them
+    parts = patterns.seen - {cls._master_re.pattern}
+    if parts != checked:
+        save_file(path, json.dumps(sorted(parts), ensure_ascii=False).encode('utf8'))
+
+def build_parser(cls, definitions):
+    """Build a Sly parser class with the cache.
+
+    This does the work of Parser._build, which it replaces,
+    but loads the LALR tables from the cache if they are there.
+
+    Arguments:
+        cls (type): Parser subclass being built
+        definitions (list): (name, value) tuples of the class body
+    """
+    rules = cls._Parser__collect_rules(definitions)
+    if not cls._Parser__validate_specification():
+        raise YaccError('Invalid parser specification')
+    cls._Parser__build_grammar(rules)
+
+    # reduce actions refer to productions by number,
+    # so the key keeps the productions in their order
+    productions = [str(p) for p in cls._grammar.Productions]
+    key = cache_key(productions, getattr(cls, 'precedence', ()), cls._grammar.Start)
+    path = cache_file(cls.__name__, key, '.pickle')
+    try:
+        with open(path, 'rb') as infile:
+            tables = pickle.load(infile)
+        cls._lrtable = types.SimpleNamespace(**tables)
+        return
+    except Exception:
+        # missing or unreadable; build the tables anew
+        pass
+
+    cls._Parser__build_lrtables()
+    tables = {
+        'lr_action': cls._lrtable.lr_action,
+        'lr_goto': cls._lrtable.lr_goto,
+        'defaulted_states': cls._lrtable.defaulted_states,
+    }
+    save_file(path, pickle.dumps(tables))
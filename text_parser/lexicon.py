@@ -0,0 +1,168 @@
+"""
+Lexicon matching for words in NENA texts.
+
+Lexicon data is stored by dialect under standards/lexicons/<dialect>.
+Each dialect has a lexicon.json, which maps lemmas to lexeme data
+(gloss, part of speech, etc.), and an inflections.json, which lists
+every known surface form together with its lemma and grammatical tags.
+
+Rather than testing every surface form against every word, the
+inflections are compiled into an index that maps a surface form
+to all of its parsing records. A word is then matched to its
+parsings with a single dictionary lookup. The lexemes and the index
+are kept in the standards bundle, see standards_bundle.py.
+
+A parsing record is the lexeme data of the lemma, updated with the
+tags of the inflection. Records are made once per form and shared by
+every word of that form, so they are read-only (see FrozenDict in
+characters.py), and the lexicon itself is never changed. Each dialect
+keeps the parsings of its most recently used forms in a memo cache
+of CACHE_SIZE forms; `cache_stats` gives its hits and misses.
+"""
+
+import re
+import json
+import functools
+import collections
+import unicodedata
+from pathlib import Path
+
+from standards_bundle import load_section
+from characters import FrozenDict
+
+STANDARDS = Path(__file__).resolve().parent.parent.joinpath('standards')
+LEXICONS = STANDARDS.joinpath('lexicons')
+
+# number of forms kept in the memo cache of each dialect
+CACHE_SIZE = 8192
+
+accents_re = re.compile('\u0300|\u0301|\u0304|\u0306|\u0308|\u0303')
+
+def normalize_nena(word):
+    """Strip vowel accents from NENA string."""
+    norm = unicodedata.normalize('NFD', word) # decompose for accent stripping
+    norm = accents_re.sub('', norm) # strip accents
+    return norm
+
+def load_lexicons(lexicons_dir=LEXICONS):
+    """Load lexicon and inflection data by dialect.
+
+    Arguments:
+        lexicons_dir (pathlib.Path): directory with a subdirectory
+            per dialect, each containing a lexicon.json and an
+            inflections.json file. Dialects missing either file
+            are skipped.
+
+    Returns:
+        2-tuple of dicts, dialect2lexicon and dialect2inflects
+    """
+    dialect2lexicon = {}
+    dialect2inflects = {}
+
+    for dialect_dir in sorted(lexicons_dir.glob('*')):
+
+        # check paths and existence of relevant data
+        lexicon_file = dialect_dir.joinpath('lexicon.json')
+        inflects_file = dialect_dir.joinpath('inflections.json')
+        if not (lexicon_file.exists() and inflects_file.exists()):
+            continue
+
+        # load and save files by dialect in dirs
+        dialect = dialect_dir.name
+        with open(lexicon_file, 'r') as infile:
+            lexicon = json.load(infile)
+        with open(inflects_file, 'r') as infile:
+            dialect2inflects[dialect] = json.load(infile)
+
+        # exclude entry text from lexeme data for now
+        # as it's too long; also exclude form string
+        dialect2lexicon[dialect] = {
+            lex: {k:v for k,v in ldata.items() if k not in {'entry', 'form'}}
+                for lex, ldata in lexicon.items()
+        }
+
+    return dialect2lexicon, dialect2inflects
+
+def index_inflections(inflects):
+    """Index inflection records by their surface form.
+
+    Forms are indexed exactly as they are written in
+    inflections.json. Records that share a form are kept
+    in the order of the inflections list, so that a lookup
+    gives the same parsings, in the same order, as testing
+    every form in turn.
+
+    Returns:
+        dict of form string to list of inflection data,
+        each without the 'form' key
+    """
+    form2inflects = collections.defaultdict(list)
+    for inflect in inflects:
+        form_data = {
+            k:v for k,v in inflect.items()
+                if k != 'form'
+        }
+        form2inflects[inflect['form']].append(form_data)
+    return dict(form2inflects)
+
+def build_lexicon_tables():
+    """Load the lexicons and index their inflections.
+
+    Returns:
+        2-tuple of dicts, dialect2lexicon and dialect2index
+    """
+    dialect2lexicon, dialect2inflects = load_lexicons()
+    dialect2index = {
+        dialect: index_inflections(inflects)
+            for dialect, inflects in dialect2inflects.items()
+    }
+    return dialect2lexicon, dialect2index
+
+# prepare lexicon matching by dialect
+dialect2lexicon, dialect2index = load_section('lexicon', build_lexicon_tables)
+
+def make_parsings(form, dialect):
+    """Make the parsing records of a normalized form.
+
+    Returns:
+        tuple of FrozenDict
+    """
+    lexicon = dialect2lexicon[dialect]
+    return tuple(
+        FrozenDict({**lexicon[match['lemma']], **match})
+            for match in dialect2index[dialect].get(form, ())
+    )
+
+# memo caches of make_parsings by dialect, made on first use
+dialect2cache = {}
+
+def get_cache(dialect):
+    cache = dialect2cache.get(dialect)
+    if cache is None:
+        cache = dialect2cache[dialect] = functools.lru_cache(maxsize=CACHE_SIZE)(
+            functools.partial(make_parsings, dialect=dialect)
+        )
+    return cache
+
+def parse_word(word, dialect):
+    """Match a word with appropriate parsing data from lexicon.
+
+    Returns:
+        tuple of read-only parsing records, shared by all
+        words with the same normalized form
+    """
+    if dialect not in dialect2index:
+        return ()
+    return get_cache(dialect)(normalize_nena(word))
+
+def cache_stats():
+    """Get the hits, misses and size of the memo cache of each dialect.
+
+    Returns:
+        dict of dialect to dict with hits, misses and size
+    """
+    return {
+        dialect: {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+            for dialect, cache in dialect2cache.items()
+                for info in [cache.cache_info()]
+    }
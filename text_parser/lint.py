@@ -0,0 +1,269 @@
+"""
+Check NENA texts for errors without building the parsed corpus.
+
+Run instructions:
+    python lint.py [--config FILE] [--version V] [--dialect D ...]
+                   [--jobs N] [--json] [indir | file ...]
+
+Each text is tokenized and checked against the grammar of the parser,
+and every error is reported with its file, line and column, both
+counted from 1, with columns in characters:
+
+    texts/alpha/Barwar/A Hundred Gold Coins.nena:12:31: unexpected NEWLINES ('\\n\\n')
+
+Nothing else is done with a text: the tokens carry no character
+metadata, words are not looked up in the lexicon, the grammar rules
+are not run, and no JSON is made. The parser's tables are run over
+the types of the tokens only. So a whole corpus is checked in a
+fraction of the time of a build, and texts are checked in parallel,
+in --jobs worker processes, by default one per CPU.
+
+Unlike the parser, which stops at the first error of a text, the
+check goes on after an error at the next block, i.e. the attributes
+or a paragraph (see parse_stream in nena_parser.py), so one run finds
+at most one grammar error per paragraph. Illegal characters, which
+the lexer skips, and malformed span tags and speaker attributes and
+a missing dialect attribute, which make it stop, are reported as well.
+
+Errors are listed in the order of the texts, and in each text by
+position; with --json they are printed as a JSON list of objects
+with file, line, column and message. The exit status is 1 if any
+text has an error.
+"""
+
+import os
+import sys
+import json
+import bisect
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from nena_parser import NenaLexer, BlockParser, split_blocks, ATTRIBUTES_START
+from build import load_config, corpus_dirs, CONFIG
+
+class LintLexer(NenaLexer):
+    """NenaLexer that keeps its errors and gives tokens with their source only.
+
+    Letters and punctuation are not turned into character records, and
+    the values of all tokens are their source. Illegal characters are
+    skipped, as by NenaLexer. They, span tags and attributes that
+    NenaLexer cannot read, and characters before the dialect is set,
+    on which build_char fails, are added to `errors` as (index,
+    message) tuples.
+    """
+
+    tokens = NenaLexer.tokens
+
+    def __init__(self):
+        super().__init__()
+        self.errors = []
+        self.dialect_checked = False
+
+    def error(self, t):
+        self.errors.append((self.index, f'illegal character {repr(t.value[0])}'))
+        self.index += 1
+
+    def check_dialect(self, t):
+        """Report a character before the dialect is set, once, as build_char would."""
+        if self.dialect is None and not self.dialect_checked:
+            self.errors.append((t.index, 'Dialect not properly delineated in metadata block!'))
+        self.dialect_checked = True
+        return t
+
+    @_(NenaLexer.ATTRIBUTE.pattern)
+    def ATTRIBUTE(self, t):
+        source = t.value
+        try:
+            NenaLexer.ATTRIBUTE(self, t)
+        except Exception as error:
+            self.errors.append((t.index, f'invalid attribute {repr(source)}: {error}'))
+        t.value = source
+        return t
+
+    @_(NenaLexer.SPAN_TAG.pattern)
+    def SPAN_TAG(self, t):
+        source = t.value
+        try:
+            NenaLexer.SPAN_TAG(self, t)
+        except Exception as error:
+            self.errors.append((t.index, str(error)))
+        t.value = source
+        return t
+
+    @_(NenaLexer.LETTER.pattern)
+    def LETTER(self, t):
+        return self.check_dialect(t)
+
+    @_(NenaLexer.PUNCT_BEGIN.pattern)
+    def PUNCT_BEGIN(self, t):
+        return self.check_dialect(t)
+
+    @_(NenaLexer.PUNCT_END.pattern)
+    def PUNCT_END(self, t):
+        return self.check_dialect(t)
+
+    @_(NenaLexer.FOREIGN_LETTER.pattern)
+    def FOREIGN_LETTER(self, t):
+        return self.check_dialect(t)
+
+# tables of the grammar of a block, for check_block
+actions = BlockParser._lrtable.lr_action
+gotos = BlockParser._lrtable.lr_goto
+defaulted_states = BlockParser._lrtable.defaulted_states
+productions = [(p.name, p.len) for p in BlockParser._grammar.Productions]
+
+def check_block(types):
+    """Check the token types of a block against the grammar.
+
+    This runs the LALR tables of BlockParser as Sly does, keeping
+    only the stack of states, without values or grammar rules.
+
+    Arguments:
+        types (list): token types of the block
+
+    Returns:
+        position in types of the first token that does not fit,
+        len(types) if the block ends too soon, or None if it is valid
+    """
+    states = [0]
+    i = 0
+    while True:
+        state = states[-1]
+        if state in defaulted_states:
+            action = defaulted_states[state]
+        else:
+            action = actions[state].get(types[i] if i < len(types) else '$end')
+        if action is None:
+            return i
+        if action > 0:
+            states.append(action)
+            i += 1
+        elif action < 0:
+            name, length = productions[-action]
+            if length:
+                del states[-length:]
+            states.append(gotos[states[-1]][name])
+        else:
+            return None
+
+def unexpected(token):
+    if token is None:
+        return 'unexpected end of text'
+    return f'unexpected {token.type} ({repr(token.value)})'
+
+def lint_tokens(tokens, text_length):
+    """Find the grammar errors of the tokens of a text.
+
+    Returns:
+        list of (index, message) tuples
+    """
+    errors = []
+    blocks = 0
+    for block, end in split_blocks(tokens):
+        attributes = not blocks
+        blocks += 1
+        if block and (block[0].type in ATTRIBUTES_START) != attributes:
+            # a block out of place fails on its first token, as in NenaParser
+            token = block[0]
+        else:
+            position = check_block([t.type for t in block])
+            if position is None:
+                continue
+            token = block[position] if position < len(block) else end
+        index = token.index if token is not None else text_length
+        errors.append((index, unexpected(token)))
+    if blocks == 1:
+        # a text needs at least one paragraph
+        errors.append((text_length, unexpected(None)))
+    return errors
+
+def lint_text(file):
+    """Check a .nena file.
+
+    Returns:
+        list of error dicts with file, line, column and message
+    """
+    file = Path(file)
+    try:
+        text = file.read_text()
+    except (OSError, UnicodeDecodeError) as error:
+        return [{'file': str(file), 'line': 0, 'column': 0, 'message': str(error)}]
+    lexer = LintLexer()
+    errors = lint_tokens(list(lexer.tokenize(text)), len(text))
+    errors.extend(lexer.errors)
+
+    # line and column of each error, counted from 1
+    line_starts = [0] + [i + 1 for i, char in enumerate(text) if char == '\n']
+    results = []
+    for index, message in sorted(errors):
+        line = bisect.bisect_right(line_starts, index)
+        results.append({
+            'file': str(file),
+            'line': line,
+            'column': index - line_starts[line - 1] + 1,
+            'message': message,
+        })
+    return results
+
+def lint_files(files, jobs=None):
+    """Check .nena files in parallel.
+
+    Arguments:
+        files (list): paths of the files
+        jobs (int): number of worker processes; by default, one per CPU
+
+    Returns:
+        list of error dicts, see lint_text, in the order of the files
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(lint_text, files, chunksize=4))
+    else:
+        results = [lint_text(file) for file in files]
+    return [error for errors in results for error in errors]
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Check NENA texts for errors.')
+    argparser.add_argument('paths', nargs='*', type=Path,
+                           help='directory with a subdirectory of .nena files per dialect, '
+                                'or .nena files')
+    argparser.add_argument('--config', type=Path, default=CONFIG,
+                           help='configuration file, see build.py')
+    argparser.add_argument('--version', metavar='V',
+                           help='corpus version, e.g. alpha')
+    argparser.add_argument('--dialect', action='append', metavar='D',
+                           help='only check the texts of this dialect; can be repeated')
+    argparser.add_argument('-j', '--jobs', type=int,
+                           help='number of texts to check at the same time')
+    argparser.add_argument('--json', action='store_true',
+                           help='print the errors as JSON')
+    args = argparser.parse_args(argv)
+
+    for path in args.paths:
+        if not path.exists():
+            argparser.error(f'no such file or directory: {path}')
+    files = [path for path in args.paths if path.is_file()]
+    dirs = [path for path in args.paths if not path.is_file()]
+    if not args.paths:
+        args.indir = args.outdir = None
+        dirs = [corpus_dirs(args, load_config(args.config))[0]]
+    for indir in dirs:
+        files.extend(
+            file for file in sorted(indir.glob('*/*.nena'))
+                if not args.dialect or file.parent.name in args.dialect
+        )
+
+    errors = lint_files(files, args.jobs)
+    if args.json:
+        print(json.dumps(errors, ensure_ascii=False, indent=1))
+    else:
+        for error in errors:
+            print(f"{error['file']}:{error['line']}:{error['column']}: {error['message']}")
+        print(f'{len(errors)} error(s) in {len(set(e["file"] for e in errors))} of {len(files)} texts',
+              file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Content-hash manifest for incremental builds of the parsed corpus.
+
+The manifest, stored as manifest.json in the output directory, records
+for each text the hash of its .nena source and the hash of the inputs
+it was parsed with: the standards files of its dialect and the parser
+modules. A text only needs to be parsed again when one of these hashes
+has changed, when the output format changed, or when its output file
+is gone.
+
+The build configuration, config.json, is not an input: it only holds
+the defaults of build.py and the other scripts, like the number of
+jobs, and the format version is recorded by the manifest itself.
+
+Some inputs, like the alphabet, are shared by all dialects. Others,
+like a dialect's lexicon or fuzzy transcription, only concern texts of
+that dialect, so a change to them leaves the other dialects alone.
+"""
+
+import json
+import hashlib
+from pathlib import Path
+
+PROJECT = Path(__file__).resolve().parent.parent
+MANIFEST_FILE = 'manifest.json'
+
+# inputs of every dialect, as glob patterns relative to the project
+SHARED_INPUTS = [
+    'standards/alphabet/alphabet.json',
+    'standards/punctuation/punctuation.json',
+    'standards/languages/foreign_languages.json',
+    'standards/languages/dialects.json',
+    'standards/transcriptions/ALL/*.json',
+    'text_parser/nena_parser.py',
+    'text_parser/characters.py',
+    'text_parser/lexicon.py',
+    'text_parser/formats.py',
+    'text_parser/grammar_cache.py',
+    'text_parser/standards_bundle.py',
+    'text_parser/elements.py',
+]
+
+# inputs of a single dialect
+DIALECT_INPUTS = [
+    'standards/transcriptions/{dialect}/*.json',
+    'standards/lexicons/{dialect}/*.json',
+]
+
+def hash_file(path):
+    """Get the SHA-256 hex digest of a file's contents."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def hash_inputs(patterns, project=PROJECT):
+    """Get a combined hash of all files matching glob patterns.
+
+    The hash covers the path and contents of every file, so
+    adding, removing or renaming a file also changes it.
+    """
+    files = sorted(set(
+        file for pattern in patterns
+            for file in project.glob(pattern)
+                if file.is_file()
+    ))
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(str(file.relative_to(project)).encode('utf8'))
+        digest.update(hash_file(file).encode('utf8'))
+    return digest.hexdigest()
+
+def hash_dialect(dialect, project=PROJECT):
+    """Get the hash of all inputs used to parse texts of a dialect."""
+    patterns = SHARED_INPUTS + [
+        pattern.format(dialect=dialect) for pattern in DIALECT_INPUTS
+    ]
+    return hash_inputs(patterns, project)
+
+class Manifest:
+    """Record of the inputs each text of a corpus was built from.
+
+    Entries are keyed by the text's path relative to the input
+    directory, e.g. 'Barwar/A Hundred Gold Coins.nena'.
+    """
+
+    def __init__(self, path, version):
+        self.path = Path(path)
+        self.version = version
+        self.texts = {}
+        if self.path.exists():
+            with open(self.path, 'r') as infile:
+                data = json.load(infile)
+            # texts written in another format must all be rebuilt
+            if data.get('format') == version:
+                self.texts = data['texts']
+
+    def is_current(self, key, source_hash, standards_hash, outfile):
+        """Check whether a text's output is built from the given inputs."""
+        entry = self.texts.get(key)
+        return (
+            entry is not None
+            and entry['source'] == source_hash
+            and entry['standards'] == standards_hash
+            and outfile.exists()
+        )
+
+    def update(self, key, source_hash, standards_hash):
+        """Record the inputs a text was built from."""
+        self.texts[key] = {'source': source_hash, 'standards': standards_hash}
+
+    def remove(self, key):
+        """Forget a text, e.g. because it failed or was deleted."""
+        self.texts.pop(key, None)
+
+    def save(self):
+        """Write the manifest to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as outfile:
+            json.dump(
+                {'format': self.version, 'texts': dict(sorted(self.texts.items()))},
+                outfile, ensure_ascii=False, indent=1,
+            )
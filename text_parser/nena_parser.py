@@ -24,12 +24,64 @@ are native to the class itself.
 
 import re
 from sly import Lexer, Parser
+from characters import (
+    alphabet_re, alphabet_strings, punct_begin_re, punct_end_re, build_char,
+)
+from lexicon import parse_word
+from grammar_cache import build_lexer, build_parser
+from elements import Word, Span
+
+# tokens that an attributes block can start with, and a paragraph cannot
+ATTRIBUTES_START = {'ATTRIBUTE', 'NEWLINE'}
+
+timestamp = re.compile(r'\d+:\d+\d*')
+linenum = re.compile(r'\d+')
+initials = re.compile(r'\D\D')
+
+def make_word(letters, dialect, beginnings=[], endings=[], objects=False):
+    """Return word dictionary, or Word object if objects is True"""
+
+    word_string = ''.join(l['decomposed_string'] for l in letters)
+    if objects:
+        return Word(word_string, letters, beginnings, endings,
+                    parse_word(word_string, dialect))
+    word_data = {
+        'class': 'word',
+        'string': word_string,
+        'letters': letters,
+        'beginnings': beginnings,
+        'endings': endings,
+    }
+    word_data['parsings'] = parse_word(word_string, dialect)
+    return word_data
+
+def split_blocks(tokens):
+    """Cut the tokens of a text at the NEWLINES between its blocks.
+
+    Yields:
+        2-tuples of the list of tokens of a block, i.e. the attributes
+        or a paragraph, and the NEWLINES token after it, or None for
+        the last block
+    """
+    block = []
+    for token in tokens:
+        if token.type == 'NEWLINES':
+            yield block, token
+            block = []
+        else:
+            block.append(token)
+    yield block, None
 
 class NenaLexer(Lexer):
     
     def __init__(self):
         super().__init__()
         self.dialect = None
+
+    @classmethod
+    def _build(cls):
+        # see grammar_cache.py
+        build_lexer(cls, super()._build)
     
     def error(self, t):
         """Give warning for bad characters"""
@@ -117,23 +169,70 @@ class NenaLexer(Lexer):
     # thus foreign string matched lastly
     @_(r'[a-zA-ZðÐɟəƏɛƐʾʿθΘ][\u0300-\u033d]*')
     def FOREIGN_LETTER(self, t):
-        letter_meta = {'class':'foreign', 'decomposed_string': t.value}
-        letter_meta.update(dict(match_transcriptions(t.value, self.dialect)))
-        t.value = letter_meta
+        t.value = build_char(t.value, 'foreign', self.dialect)
         return t
 
 class NenaParser(Parser):
     
-    def __init__(self, dialect):
+    def __init__(self, dialect, objects=False):
+        """Make a parser for the texts of a dialect.
+
+        Arguments:
+            dialect (str): dialect of the texts
+            objects (bool): if True, words and spans are given as
+                the compact objects of elements.py, not as dicts
+        """
         super().__init__()
         self.dialect = dialect
+        self.objects = objects
+
+    @classmethod
+    def _build(cls, definitions):
+        # Sly only sees the rules in the body of a class, so those of
+        # a subclass are added to, or replace, the rules of its base;
+        # see BlockParser
+        rules = dict(getattr(cls, 'definitions', {}))
+        rules.update(definitions)
+        cls.definitions = rules
+        # replaces Sly's own build; see grammar_cache.py
+        build_parser(cls, list(rules.items()))
     
     #debugfile = 'nena_parser.out'
     tokens = NenaLexer.tokens
+
+    # positions of parsed values are not used; tracking
+    # them keeps a record of every reduction ever made
+    track_positions = False
     
     def error(self, t):
+        if t is None:
+            raise Exception('unexpected end of text')
         raise Exception(f'unexpected {t.type} ({repr(t.value)}) at index {t.index}')    
-    
+
+    def parse_stream(self, tokens):
+        """Parse a text one block at a time.
+
+        The tokens are cut at the NEWLINES between the attributes
+        and the paragraphs, and each block is parsed on its own as
+        soon as its last token is in. Only the paragraph being parsed
+        is held in memory, rather than the whole text. Errors are the
+        same as those of parse, but are raised when the block they
+        are in is reached, after the blocks before it were yielded.
+
+        Arguments:
+            tokens (iterable): tokens of a text, from NenaLexer.tokenize
+
+        Yields:
+            the attributes of the text, then each of its paragraphs,
+            the same as the [attributes, text_block] given by parse
+        """
+        parser = BlockParser(self.dialect, self.objects)
+        for i, (block, end) in enumerate(split_blocks(tokens)):
+            yield parser.parse_block(block, i == 0, end)
+        if i == 0:
+            # a text needs at least one paragraph
+            self.error(None)
+
     @_('attributes NEWLINES text_block')
     def nena(self, p):
         return [p.attributes, p.text_block]
@@ -147,9 +246,14 @@ class NenaParser(Parser):
     def attributes(self, p):
         return p.ATTRIBUTE
     
+    # NB: lists are built with left-recursive rules and
+    # extended in place, since copying the list made
+    # so far at each step takes quadratic time
+
     @_('text_block NEWLINES paragraph')
     def text_block(self, p):
-        return p.text_block + [p.paragraph]
+        p.text_block.append(p.paragraph)
+        return p.text_block
     
     @_('paragraph')
     def text_block(self, p):
@@ -157,16 +261,22 @@ class NenaParser(Parser):
     
     @_('paragraph element')
     def paragraph(self, p):
-        return p.paragraph + [p.element]
+        p.paragraph.append(p.element)
+        return p.paragraph
     
     @_('element')
     def paragraph(self, p):
         return [p.element]
     
-    @_('word',
-       'SPAN_TAG')
+    @_('word')
     def element(self, p):
-        return p[0]
+        return p.word
+
+    @_('SPAN_TAG')
+    def element(self, p):
+        if self.objects:
+            return Span.from_dict(p.SPAN_TAG)
+        return p.SPAN_TAG
     
     @_('beginnings letters endings', 
        'letters endings',
@@ -179,12 +289,13 @@ class NenaParser(Parser):
         beginnings = getattr(p, 'beginnings', [])
         default_end = build_char(' ', 'punctuation', self.dialect)
         endings =  getattr(p, 'endings', [default_end])
-        return make_word(p.letters, self.dialect, beginnings, endings)
+        return make_word(p.letters, self.dialect, beginnings, endings, self.objects)
 
-    @_('PUNCT_BEGIN beginnings',
-       'LANG_START beginnings')
+    @_('beginnings PUNCT_BEGIN',
+       'beginnings LANG_START')
     def beginnings(self, p):
-        return [p[0]] + p.beginnings
+        p.beginnings.append(p[1])
+        return p.beginnings
     
     @_('PUNCT_BEGIN',
        'LANG_START')
@@ -201,19 +312,103 @@ class NenaParser(Parser):
     @_('endings PUNCT_END',
        'endings LANG_END',)
     def endings(self, p):
-        return p.endings + [p[1]]
+        p.endings.append(p[1])
+        return p.endings
     
     @_('PUNCT_END',
        'LANG_END')
     def endings(self, p):
         return [p[0]]
         
-    @_('LETTER letters', 
-       'FOREIGN_LETTER letters')
+    @_('letters LETTER',
+       'letters FOREIGN_LETTER')
     def letters(self, p):
-        return [p[0]] + p[1]
+        p.letters.append(p[1])
+        return p.letters
     
     @_('LETTER', 
        'FOREIGN_LETTER')
     def letters(self, p):
         return [p[0]]
+
+class BlockParser(NenaParser):
+    """NenaParser of a single block of a text, for parse_stream.
+
+    A block is either the attributes at the top of a text or one of
+    its paragraphs, which are told apart by their first token.
+    """
+
+    start = 'block'
+    end = None
+    # blocks are cut at the NEWLINES, which they do not contain
+    tokens = NenaLexer.tokens - {'NEWLINES'}
+
+    # rules of whole texts, which are not used here
+    nena = text_block = None
+
+    @_('attributes',
+       'paragraph')
+    def block(self, p):
+        return p[0]
+
+    def error(self, t):
+        # the end of a block is the NEWLINES after it, if any
+        super().error(t or self.end)
+
+    def parse_block(self, tokens, attributes=False, end=None):
+        """Parse a block of tokens.
+
+        Arguments:
+            tokens (list): tokens of the block
+            attributes (bool): whether the block should be the
+                attributes of the text, rather than a paragraph
+            end (Token): the NEWLINES token after the block, or None
+                at the end of the text
+
+        Returns:
+            the attributes dict, or the paragraph list
+        """
+        self.end = end
+        # a block out of place fails on its first token, as in NenaParser
+        if tokens and (tokens[0].type in ATTRIBUTES_START) != attributes:
+            self.error(tokens[0])
+        return self.parse(iter(tokens))
+
+class GraphemeLexer(NenaLexer):
+    """NENA lexer that matches letters by grapheme instead of by regex.
+
+    The LETTER regex of NenaLexer is an alternation of every letter
+    of the alphabet, each with a lookahead for combining marks, which
+    the regex engine tries one after the other. This lexer instead
+    cuts out a grapheme cluster, i.e. a base letter with all of its
+    combining marks, and looks it up in the alphabet.
+
+    Anything that is not a letter of the alphabet, like a foreign
+    letter, is handed to the regexes of NenaLexer, so that both
+    lexers give the same tokens for any text.
+    """
+
+    tokens = NenaLexer.tokens
+
+    @_(r'[^\W\d_][\u0300-\u036f]*')
+    def LETTER(self, t):
+        if t.value in alphabet_strings:
+            t.value = build_char(t.value, 'letter', self.dialect)
+            return t
+        return self.match_regex(t)
+
+    def match_regex(self, t):
+        """Match a token at the start of t with NenaLexer's regexes."""
+        m = NenaLexer._master_re.match(self.text, t.index)
+        if m is None:
+            self.index = t.index
+            t.type = 'ERROR'
+            t.value = self.text[t.index:]
+            return self.error(t)
+        t.type = m.lastgroup
+        t.value = m.group()
+        t.end = self.index = m.end()
+        token_func = NenaLexer._token_funcs.get(t.type)
+        if token_func is not None:
+            return token_func(self, t)
+        return t
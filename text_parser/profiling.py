@@ -0,0 +1,214 @@
+"""
+Optional profiling of corpus builds.
+
+Profiling is off unless `enable` is called, e.g. by
+`python build.py --profile report.json`. While it is off, `profile`
+is None, `stage` gives a shared context manager that does nothing,
+and the parser calls build_char and parse_word directly, so a build
+runs as it would without this module.
+
+When it is on, a Profile collects, per text:
+
+    stages: wall time of reading the source, lexing, parsing,
+        encoding the JSON and writing it, and, within lexing and
+        parsing, the time spent building character metadata that
+        was not in the character table yet, and looking up words
+        in the lexicon
+    counters: tokens and words, hits and misses of the character
+        table and of the lexicon, and hits and misses of the memo
+        cache of parsings (see lexicon.py)
+
+The parser's build_char and parse_word are swapped for counting
+versions in nena_parser, so the lexers and make_word count as they
+go. Worker processes each have their own Profile. The counts of a
+text are handed back with its result and added up by the main
+process, which writes the report:
+
+    {
+        "format": 1,
+        "wall_seconds": 12.3,
+        "texts": 126,
+        "stages": {"read": ..., "lex": ..., ...},
+        "counters": {"tokens": ..., "chars.hits": ..., ...},
+        "hit_rates": {"chars": 0.99, "lexicon": 0.71, "memo": 0.83},
+        "rates": {"tokens_per_second": ..., "words_per_second": ...},
+        "slowest": [{"text": "Barwar/A Hundred Gold Coins.nena",
+                     "seconds": 0.4, "tokens": ..., "words": ...}, ...]
+    }
+
+Stage times are summed over all workers, so with several jobs they
+add up to more than the wall time of the build.
+"""
+
+import json
+import time
+import contextlib
+
+import lexicon
+import characters
+import nena_parser
+from characters import build_char
+from lexicon import parse_word
+
+PROFILE_VERSION = 1
+
+# stages that follow each other, and stages within one of them
+STAGES = ('read', 'lex', 'parse', 'encode', 'write')
+NESTED_STAGES = {'metadata': 'lex', 'lexicon': 'parse'}
+
+# number of slowest texts in the report
+SLOWEST = 10
+
+# the profile of the current process, or None when profiling is off
+profile = None
+
+NULL_STAGE = contextlib.nullcontext()
+
+class Profile:
+    """Stage times and counters of the texts of one process."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.memo = memo_counts()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0) + elapsed
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def take(self):
+        """Get the stage times and counters so far, and start over."""
+        # the memo caches keep their own counts, for all texts so far
+        memo = memo_counts()
+        for name, n, last in zip(('memo.hits', 'memo.misses'), memo, self.memo):
+            if n > last:
+                self.count(name, n - last)
+        self.memo = memo
+        stats = {'stages': self.stages, 'counters': self.counters}
+        self.stages = {}
+        self.counters = {}
+        return stats
+
+def memo_counts():
+    """Get the hits and misses of the memo caches of all dialects."""
+    stats = lexicon.cache_stats().values()
+    return (sum(s['hits'] for s in stats), sum(s['misses'] for s in stats))
+
+def stage(name):
+    """Time a stage of the current text, if profiling is on."""
+    if profile is None:
+        return NULL_STAGE
+    return profile.stage(name)
+
+def count(name, n=1):
+    if profile is not None:
+        profile.count(name, n)
+
+def take():
+    """Get the stats of the current text, or None if profiling is off."""
+    if profile is None:
+        return None
+    return profile.take()
+
+def counted_build_char(string, kind, dialect):
+    """build_char, counting hits and misses of the character table."""
+    if (string, kind) in characters.dialect2chars.get(dialect, ()):
+        profile.count('chars.hits')
+        return build_char(string, kind, dialect)
+    profile.count('chars.misses')
+    with profile.stage('metadata'):
+        return build_char(string, kind, dialect)
+
+def counted_parse_word(word, dialect):
+    """parse_word, counting the words found in the lexicon or not."""
+    with profile.stage('lexicon'):
+        parsings = parse_word(word, dialect)
+    profile.count('words')
+    profile.count('lexicon.hits' if parsings else 'lexicon.misses')
+    return parsings
+
+def enable():
+    """Turn on profiling in the current process."""
+    global profile
+    profile = Profile()
+    nena_parser.build_char = counted_build_char
+    nena_parser.parse_word = counted_parse_word
+
+def disable():
+    """Turn off profiling in the current process."""
+    global profile
+    profile = None
+    nena_parser.build_char = build_char
+    nena_parser.parse_word = parse_word
+
+def hit_rate(counters, name):
+    hits = counters.get(f'{name}.hits', 0)
+    total = hits + counters.get(f'{name}.misses', 0)
+    return round(hits / total, 4) if total else None
+
+class Report:
+    """Adds up the stats of the texts of a build."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.texts = []
+
+    def add(self, text, stats):
+        """Add the stats of a text, as returned by `take`.
+
+        Stats of work that is not part of a single text are
+        added with a text of None.
+        """
+        if stats is None:
+            return
+        for name, seconds in stats['stages'].items():
+            self.stages[name] = self.stages.get(name, 0) + seconds
+        for name, n in stats['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+        if text is None:
+            return
+        self.texts.append({
+            'text': text,
+            'seconds': round(sum(stats['stages'].get(s, 0) for s in STAGES), 4),
+            'tokens': stats['counters'].get('tokens', 0),
+            'words': stats['counters'].get('words', 0),
+        })
+
+    def data(self):
+        wall = time.perf_counter() - self.start
+        lex = self.stages.get('lex')
+        parse = self.stages.get('parse')
+        return {
+            'format': PROFILE_VERSION,
+            'wall_seconds': round(wall, 4),
+            'texts': len(self.texts),
+            'stages': {
+                name: round(self.stages[name], 4)
+                    for name in (*STAGES, *NESTED_STAGES) if name in self.stages
+            },
+            'counters': dict(sorted(self.counters.items())),
+            'hit_rates': {
+                'chars': hit_rate(self.counters, 'chars'),
+                'lexicon': hit_rate(self.counters, 'lexicon'),
+                'memo': hit_rate(self.counters, 'memo'),
+            },
+            'rates': {
+                'tokens_per_second': round(self.counters.get('tokens', 0) / lex, 1) if lex else None,
+                'words_per_second': round(self.counters.get('words', 0) / parse, 1) if parse else None,
+            },
+            'slowest': sorted(self.texts, key=lambda t: -t['seconds'])[:SLOWEST],
+        }
+
+    def write(self, path):
+        with open(path, 'w') as outfile:
+            json.dump(self.data(), outfile, ensure_ascii=False, indent=1)
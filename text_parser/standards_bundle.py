@@ -0,0 +1,109 @@
+"""
+Precompiled bundle of the tables built from the standards.
+
+Run instructions:
+    python standards_bundle.py [--force]
+
+When characters.py and lexicon.py are imported, i.e. in every worker
+process of a build, they read the standards and build their lookup
+tables from them:
+
+    characters: the character records of each dialect, which takes
+        matching every letter and punctuation mark against all of
+        the standard regexes and looking up its transcriptions
+    lexicon: the lexeme records without their entry and form, and
+        the index of the inflections by surface form
+
+The bundle keeps these tables, in one pickle file per version of
+the standards, in text_parser/.cache. Each module stores its tables
+as a section of the bundle, by name, the first time it builds them,
+and later imports load them from the bundle instead.
+
+The bundle is looked up by a hash of the contents of the standards
+files and of the modules that build the tables, so changing any of
+them simply gives a new bundle. Running this script builds the
+bundle of the current standards up front. It can be deleted at any
+time; if it cannot be read or written, the tables are built as usual.
+"""
+
+import time
+import pickle
+import argparse
+
+from grammar_cache import cache_key, cache_file, save_file
+from manifest import hash_inputs
+
+BUNDLE_VERSION = 1
+
+# files the tables are built from, relative to the project
+INPUTS = [
+    'standards/alphabet/alphabet.json',
+    'standards/punctuation/punctuation.json',
+    'standards/languages/*.json',
+    'standards/transcriptions/*/*.json',
+    'standards/lexicons/*/*.json',
+    'text_parser/characters.py',
+    'text_parser/lexicon.py',
+    'text_parser/standards_bundle.py',
+]
+
+# sections of the bundle file of this process, once it is read
+_sections = None
+_path = None
+
+def bundle_path():
+    """Get the path of the bundle of the current standards."""
+    global _path
+    if _path is None:
+        _path = cache_file('standards', cache_key(BUNDLE_VERSION, hash_inputs(INPUTS)), '.pickle')
+    return _path
+
+def read_bundle():
+    """Get the sections of the bundle, or {} if there is none yet."""
+    global _sections
+    if _sections is None:
+        try:
+            with open(bundle_path(), 'rb') as infile:
+                _sections = pickle.load(infile)
+        except Exception:
+            # missing, partial or from an incompatible Python
+            _sections = {}
+    return _sections
+
+def load_section(name, build):
+    """Get a section of the bundle, building and storing it if needed.
+
+    Arguments:
+        name (str): name of the section, e.g. 'characters'
+        build (callable): builds the section from the standards
+
+    Returns:
+        the section, as returned by build
+    """
+    sections = read_bundle()
+    if name not in sections:
+        sections[name] = build()
+        save_file(bundle_path(), pickle.dumps(sections, protocol=pickle.HIGHEST_PROTOCOL))
+    return sections[name]
+
+def main(argv=None):
+    global _sections
+    argparser = argparse.ArgumentParser(description='Build the bundle of the NENA standards.')
+    argparser.add_argument('--force', action='store_true',
+                           help='build the bundle, even if it is up to date')
+    args = argparser.parse_args(argv)
+
+    path = bundle_path()
+    if args.force:
+        path.unlink(missing_ok=True)
+        _sections = {}
+    start = time.perf_counter()
+    # the modules build or load their sections when imported
+    import characters
+    import lexicon
+    elapsed = time.perf_counter() - start
+    print(f'{path.name}: {", ".join(sorted(read_bundle()))}, '
+          f'{path.stat().st_size:,} bytes, ready in {elapsed*1000:.0f}ms')
+
+if __name__ == '__main__':
+    main()
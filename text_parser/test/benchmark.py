@@ -0,0 +1,315 @@
+"""
+Benchmark the stages of the NENA pipeline.
+
+Run instructions:
+    python benchmark.py [--scale N ...] [--stage S ...] [--repeat N]
+                        [--no-memory] [--save] [--tolerance F]
+                        [--baseline FILE] [--json]
+
+Each stage is timed on its own, on inputs that are prepared before
+the clock starts:
+
+    lex: NenaLexer on the .nena texts, in tokens/s
+    chars: build_char on the letters met by the lexer, in chars/s
+    lexicon: parse_word on the strings of the parsed words, in words/s
+    parse: NenaParser on tokens lexed beforehand, in words/s
+    export: write_text in the default format, in words/s
+    html: html_todict on the source HTML files, in bytes/s
+
+The texts are those of texts/alpha, as they are (--scale 1) or with
+each paragraph made N times longer (--scale N), as in check_scaling.py.
+The html stage always uses the real files of sources/msdoc2html, and
+needs lxml and titlecase; it is skipped if they are not installed.
+
+The best of --repeat runs is reported. After the timed runs, a stage
+is run once more under tracemalloc for its peak memory, which is
+the most memory Python allocated during the stage beyond its inputs.
+
+Results are compared with the baselines in benchmarks.json, where
+they are kept by stage and scale. A rate that is lower, or a peak
+that is higher, than its baseline by more than the tolerance is a
+regression, and the script exits with 1. --save stores the results
+of this run as the new baselines. Baselines are only meaningful on
+the machine they were measured on.
+"""
+
+import io
+import sys
+import json
+import time
+import tempfile
+import argparse
+import platform
+import contextlib
+import tracemalloc
+from pathlib import Path
+
+TEST_DIR = Path(__file__).resolve().parent
+TEXT_PARSER = TEST_DIR.parent
+PROJECT = TEXT_PARSER.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from nena_parser import NenaLexer, NenaParser
+from characters import build_char
+from lexicon import parse_word
+from formats import write_text
+from check_scaling import enlarge
+
+TEXTS = PROJECT.joinpath('texts', 'alpha')
+HTML_DIR = PROJECT.joinpath('sources', 'msdoc2html')
+BASELINES = TEST_DIR.joinpath('benchmarks.json')
+BENCHMARKS_VERSION = 1
+TOLERANCE = 0.25
+
+STAGES = ('lex', 'chars', 'lexicon', 'parse', 'export', 'html')
+
+# unit of the rate of each stage
+UNITS = {
+    'lex': 'tokens',
+    'chars': 'chars',
+    'lexicon': 'words',
+    'parse': 'words',
+    'export': 'words',
+    'html': 'bytes',
+}
+
+def load_texts(scale=1):
+    """Read the texts of the corpus, made `scale` times longer.
+
+    Returns:
+        list of (dialect, title, text)
+    """
+    texts = []
+    for file in sorted(TEXTS.glob('*/*.nena')):
+        text = file.read_text()
+        if scale > 1:
+            text = enlarge(text, scale)
+        texts.append((file.parent.name, file.stem, text))
+    return texts
+
+def count_words(parsed):
+    """Count the words of a parsed text."""
+    return sum(
+        1 for paragraph in parsed[1] for element in paragraph
+            if element.get('class') == 'word'
+    )
+
+class Inputs:
+    """Inputs of the stages, made once per scale.
+
+    Texts that fail to lex or parse are left out of the stages
+    that need their tokens or parse.
+    """
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.texts = load_texts(scale)
+        self.tokens = []
+        self.letters = []
+        self.parsed = []
+        self.words = []
+        lexer = NenaLexer()
+        dialect2parser = {}
+        for dialect, title, text in self.texts:
+            try:
+                tokens = list(lexer.tokenize(text))
+                if dialect not in dialect2parser:
+                    dialect2parser[dialect] = NenaParser(dialect)
+                parsed = dialect2parser[dialect].parse(iter(tokens))
+            except Exception:
+                continue
+            self.tokens.append((dialect, tokens))
+            self.letters.extend(
+                (t.value['decomposed_string'], dialect) for t in tokens
+                    if t.type == 'LETTER'
+            )
+            self.parsed.append((dialect, title, parsed))
+            self.words.extend(
+                (element['string'], dialect)
+                    for paragraph in parsed[1] for element in paragraph
+                        if element.get('class') == 'word'
+            )
+
+def run_lex(inputs):
+    lexer = NenaLexer()
+    count = 0
+    for dialect, title, text in inputs.texts:
+        try:
+            for token in lexer.tokenize(text):
+                count += 1
+        except Exception:
+            pass
+    return count
+
+def run_chars(inputs):
+    for string, dialect in inputs.letters:
+        build_char(string, 'letter', dialect)
+    return len(inputs.letters)
+
+def run_lexicon(inputs):
+    for string, dialect in inputs.words:
+        parse_word(string, dialect)
+    return len(inputs.words)
+
+def run_parse(inputs):
+    dialect2parser = {}
+    count = 0
+    for dialect, tokens in inputs.tokens:
+        if dialect not in dialect2parser:
+            dialect2parser[dialect] = NenaParser(dialect)
+        count += count_words(dialect2parser[dialect].parse(iter(tokens)))
+    return count
+
+def run_export(inputs):
+    count = 0
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for dialect, title, parsed in inputs.parsed:
+            write_text(parsed, Path(tmpdir, f'{title}.json'))
+            count += count_words(parsed)
+    return count
+
+def html_stage():
+    """Get the runner of the html stage, or None without its dependencies."""
+    sys.path.insert(0, str(HTML_DIR))
+    try:
+        from html_to_nena import html_todict
+        from convert import file_config
+    except ImportError as error:
+        print(f'html: skipped, {error}')
+        return None
+    files = sorted(HTML_DIR.glob('dialects/*/*.html'))
+
+    def run_html(inputs):
+        # html_todict prints the title of every text
+        with contextlib.redirect_stdout(io.StringIO()):
+            for file in files:
+                html_todict(file, **file_config(file))
+        return sum(file.stat().st_size for file in files)
+
+    return run_html
+
+def measure(run, inputs, repeat, memory):
+    """Time a stage and, optionally, measure its peak memory.
+
+    Returns:
+        dict with count, seconds, rate and peak_mb
+    """
+    seconds = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        count = run(inputs)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    result = {
+        'count': count,
+        'seconds': round(seconds, 4),
+        'rate': round(count / seconds, 1) if seconds else None,
+    }
+    if memory:
+        tracemalloc.start()
+        run(inputs)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_mb'] = round(peak / 2**20, 2)
+    return result
+
+def compare(results, baselines, tolerance):
+    """Find the results that are worse than their baselines.
+
+    Returns:
+        list of messages
+    """
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        if result['rate'] and baseline.get('rate'):
+            if result['rate'] < baseline['rate'] * (1 - tolerance):
+                regressions.append(
+                    f"{key}: rate {result['rate']:,.0f} < baseline {baseline['rate']:,.0f}"
+                )
+        if 'peak_mb' in result and baseline.get('peak_mb'):
+            if result['peak_mb'] > baseline['peak_mb'] * (1 + tolerance):
+                regressions.append(
+                    f"{key}: peak {result['peak_mb']}MB > baseline {baseline['peak_mb']}MB"
+                )
+    return regressions
+
+def load_baselines(path):
+    if not path.exists():
+        return {}
+    with open(path, 'r') as infile:
+        data = json.load(infile)
+    if data.get('format') != BENCHMARKS_VERSION:
+        return {}
+    return data['results']
+
+def save_baselines(path, results):
+    """Store results as baselines, keeping those of other stages and scales."""
+    baselines = load_baselines(path)
+    baselines.update(results)
+    data = {
+        'format': BENCHMARKS_VERSION,
+        'machine': f'{platform.machine()} {platform.processor()}'.strip(),
+        'python': platform.python_version(),
+        'results': dict(sorted(baselines.items())),
+    }
+    with open(path, 'w') as outfile:
+        json.dump(data, outfile, indent=1)
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Benchmark the stages of the NENA pipeline.')
+    argparser.add_argument('--scale', type=int, nargs='+', default=[1],
+                           help='make each paragraph N times longer')
+    argparser.add_argument('--stage', choices=STAGES, nargs='+', default=list(STAGES))
+    argparser.add_argument('--repeat', type=int, default=1,
+                           help='report the best of N runs')
+    argparser.add_argument('--no-memory', action='store_true',
+                           help='skip the tracemalloc run of each stage')
+    argparser.add_argument('--baseline', type=Path, default=BASELINES)
+    argparser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                           help='fraction a result may be worse than its baseline')
+    argparser.add_argument('--save', action='store_true',
+                           help='store the results as the new baselines')
+    argparser.add_argument('--json', action='store_true',
+                           help='print the results as JSON')
+    args = argparser.parse_args(argv)
+
+    runners = {
+        'lex': run_lex,
+        'chars': run_chars,
+        'lexicon': run_lexicon,
+        'parse': run_parse,
+        'export': run_export,
+    }
+    if 'html' in args.stage:
+        runners['html'] = html_stage()
+
+    results = {}
+    for scale in args.scale:
+        inputs = Inputs(scale)
+        for stage in args.stage:
+            run = runners[stage]
+            if run is None:
+                continue
+            # the html stage does not scale
+            if stage == 'html' and scale != 1:
+                continue
+            result = measure(run, inputs, args.repeat, not args.no_memory)
+            results[f'{stage}@{scale}x'] = result
+            if not args.json:
+                peak = f", peak {result['peak_mb']}MB" if 'peak_mb' in result else ''
+                print(f"{stage}@{scale}x: {result['count']:,} {UNITS[stage]} in "
+                      f"{result['seconds']:.3f}s, {result['rate']:,.0f} {UNITS[stage]}/s{peak}")
+
+    regressions = compare(results, load_baselines(args.baseline), args.tolerance)
+    if args.json:
+        print(json.dumps({'results': results, 'regressions': regressions}, indent=1))
+    for message in regressions:
+        print(f'REGRESSION {message}', file=sys.stderr)
+    if args.save:
+        save_baselines(args.baseline, results)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Check that corpus bundles give back the texts they were written from.
+
+Run instructions:
+    python check_bundles.py [corpus_dir]
+
+The texts of a parsed corpus, by default parsed_texts/alpha, are
+written to bundles with each compression, in a temporary directory.
+The check fails if any text read back from a bundle, either one at
+a time through the index or all in order, differs from the text in
+the corpus. The size of the bundles and the time taken to read the
+whole corpus are reported as well.
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from formats import Corpus, PARSINGS_FILE
+from bundles import write_bundles, BundleCorpus, COMPRESSIONS
+
+DEFAULT_CORPUS = TEXT_PARSER.parent.joinpath('parsed_texts', 'alpha')
+
+def main(path=DEFAULT_CORPUS):
+    corpus = Corpus(path)
+    start = time.perf_counter()
+    # bundles hold the parsing records of a version 3 corpus
+    resolve = corpus.path.joinpath(PARSINGS_FILE).exists()
+    texts = {
+        (dialect, title): corpus.read(dialect, title, resolve)
+            for dialect, title in corpus.texts()
+    }
+    print(f'{len(texts)} texts: JSON files read in {time.perf_counter() - start:.2f}s, '
+          f'{sum(file.stat().st_size for file in corpus.path.glob("*/*.json")):,} bytes')
+
+    failed = False
+    for compression in COMPRESSIONS:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write_bundles(corpus, Path(tmpdir), compression)
+            size = sum(file.stat().st_size for file in Path(tmpdir).glob('*.jsonl*'))
+            bundles = BundleCorpus(tmpdir)
+            if bundles.texts() != corpus.texts():
+                print(f'FAILED: {compression} bundles list other texts')
+                failed = True
+                continue
+
+            start = time.perf_counter()
+            streamed = {(dialect, title): text for dialect, title, text in bundles.iter_texts()}
+            elapsed = time.perf_counter() - start
+            print(f'{compression}: read in {elapsed:.2f}s, {size:,} bytes')
+            for (dialect, title), text in texts.items():
+                if streamed[(dialect, title)] != text or bundles.read(dialect, title) != text:
+                    print(f'FAILED: {dialect}/{title} differs in the {compression} bundle')
+                    failed = True
+                    break
+
+    if failed:
+        return 1
+    print('√ bundles give back the texts of the corpus')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,164 @@
+"""
+Check that the columns of a corpus give back the words of its texts.
+
+Run instructions:
+    python check_columns.py [corpus_dir]
+
+The texts of a parsed corpus, by default parsed_texts/alpha, are
+written as columns in a temporary directory and loaded again. The
+check fails if any word read from the columns differs from the word
+in the corpus. Its string, letters, beginnings, endings, lemmas,
+speaker and language are compared. The check also fails if the
+offsets of the texts, paragraphs and lines do not hold the same
+words as in the corpus.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from formats import Corpus
+from columns import write_columns, load_columns
+
+DEFAULT_CORPUS = TEXT_PARSER.parent.joinpath('parsed_texts', 'alpha')
+
+def corpus_words(corpus, dialect, title):
+    """Get the words of a text as the columns should give them.
+
+    Returns:
+        list of paragraphs, each a list of word dicts, and a list of
+        (line_number, index in the text of its first word) tuples
+    """
+    metadata, text_block = corpus.read(dialect, title)
+    paragraphs = []
+    lines = []
+    speaker = lang = None
+    nwords = 0
+    for paragraph in text_block:
+        words = []
+        for element in paragraph:
+            if element.get('class') != 'word':
+                if 'line_number' in element:
+                    lines.append((int(element['line_number']), nwords))
+                if 'speaker' in element:
+                    speaker = element['speaker']
+                continue
+            for char in element['beginnings']:
+                if char.get('class') == 'LANG_START':
+                    lang = char['lang']
+            words.append({
+                'string': element['string'],
+                'letters': list(element['letters']),
+                'beginnings': list(element['beginnings']),
+                'endings': list(element['endings']),
+                'lemmas': [p.get('lemma') for p in corpus.get_parsings(element)],
+                'speaker': speaker,
+                'lang': lang,
+            })
+            for char in element['endings']:
+                if char.get('class') == 'LANG_END':
+                    lang = None
+            nwords += 1
+        paragraphs.append(words)
+    return paragraphs, lines
+
+def column_word(columns, word):
+    """Get a word from the columns, as given by corpus_words."""
+    def chars(key):
+        offsets = getattr(columns, f'word_{key}')
+        return [columns.chars[i] for i in getattr(columns, key)[offsets[word]:offsets[word+1]]]
+    lemmas = columns.lemmas[columns.word_lemmas[word]:columns.word_lemmas[word+1]]
+    speaker = columns.word_speaker[word]
+    lang = columns.word_lang[word]
+    return {
+        'string': columns.word_string(word),
+        'letters': chars('letters'),
+        'beginnings': chars('beginnings'),
+        'endings': chars('endings'),
+        'lemmas': [columns.lemma_table[i] for i in lemmas],
+        'speaker': columns.speakers[speaker] if speaker >= 0 else None,
+        'lang': columns.langs[lang] if lang >= 0 else None,
+    }
+
+def check_text(corpus, columns, dialect, text):
+    """Compare a text of the corpus with its columns.
+
+    Returns:
+        error message, or None
+    """
+    title = columns.texts[text]['title']
+    paragraphs, lines = corpus_words(corpus, dialect, title)
+    words = columns.text_range(text)
+    if len(words) != sum(len(paragraph) for paragraph in paragraphs):
+        return f'{len(words)} words, not {sum(len(p) for p in paragraphs)}'
+
+    # offsets of the paragraphs of the text
+    first = columns.text_paragraphs[text]
+    offsets = columns.paragraph_words[first:columns.text_paragraphs[text+1]+1]
+    expected = [words.start]
+    for paragraph in paragraphs:
+        expected.append(expected[-1] + len(paragraph))
+    if list(offsets) != expected:
+        return 'paragraph offsets differ'
+
+    # lines with words, like those of DialectWriter.start_line
+    starts = {}
+    for number, start in [(0, 0)] + lines:
+        starts[start] = number
+    expected = [
+        (number, words.start + start) for start, number in sorted(starts.items())
+            if start < len(words)
+    ]
+    found = [
+        (int(columns.line_numbers[i]), int(columns.line_words[i]))
+            for i in range(len(columns.line_numbers))
+                if words.start <= columns.line_words[i] < words.stop
+    ]
+    if found != expected:
+        return 'lines differ'
+
+    word = words.start
+    for paragraph in paragraphs:
+        for expected in paragraph:
+            found = column_word(columns, word)
+            if found != expected:
+                keys = [key for key in expected if found[key] != expected[key]]
+                return f'word {word - words.start} differs in {", ".join(keys)}'
+            word += 1
+    return None
+
+def main(path=DEFAULT_CORPUS):
+    corpus = Corpus(path)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_columns(corpus, Path(tmpdir))
+        dialects = load_columns(tmpdir)
+        titles = {}
+        for dialect, title in corpus.texts():
+            titles.setdefault(dialect, []).append(title)
+        if sorted(dialects) != sorted(titles):
+            print(f'FAILED: columns of {sorted(dialects)}, not {sorted(titles)}')
+            return 1
+        ntexts = 0
+        for dialect, columns in dialects.items():
+            if [text['title'] for text in columns.texts] != titles[dialect]:
+                print(f'FAILED: {dialect}: the titles of the columns differ')
+                failed = True
+                continue
+            for text in range(len(columns.texts)):
+                error = check_text(corpus, columns, dialect, text)
+                if error:
+                    print(f'FAILED: {dialect}/{columns.texts[text]["title"]}: {error}')
+                    failed = True
+                ntexts += 1
+        print(f'{ntexts} texts checked')
+
+    if failed:
+        return 1
+    print('√ the columns give back the words of the corpus')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,137 @@
+"""
+Check the pages of the concordance against a full sort of its hits.
+
+Run instructions:
+    python check_concordance.py [corpus_dir] [page_size]
+
+The concordance and word index of a parsed corpus, by default
+parsed_texts/alpha, are built in memory. The words of the corpus are
+also gathered straight from its JSON texts. For the most frequent
+form and for a lemma, the check fails in any of these cases:
+
+- the hits are not the words with that form or lemma
+- the pages of a sort order, one after the other, do not give the
+  lines of all hits sorted in full, with their context taken from
+  the scanned words, within texts or paragraphs
+- the page after the last one is not empty
+"""
+
+import sys
+from pathlib import Path
+from collections import Counter
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from formats import Corpus
+from word_index import WordIndex, index_corpus
+from concordance import Concordance, build_concordance, word_string, SORTS
+
+DEFAULT_CORPUS = TEXT_PARSER.parent.joinpath('parsed_texts', 'alpha')
+PAGE_SIZE = 50
+WIDTH = 5
+LEMMA = 'xa'
+
+def scan_corpus(corpus):
+    """Gather the words of a corpus, in corpus order.
+
+    Returns:
+        list of dicts with form, string, lemmas, text, paragraph
+        and line_number
+    """
+    words = []
+    paragraph = 0
+    for dialect, title in corpus.texts():
+        metadata, text_block = corpus.read(dialect, title)
+        line = None
+        for elements in text_block:
+            for element in elements:
+                if element.get('class') != 'word':
+                    if 'line_number' in element:
+                        line = int(element['line_number'])
+                    continue
+                words.append({
+                    'form': element['string'],
+                    'string': word_string(element),
+                    'lemmas': {p.get('lemma') for p in corpus.get_parsings(element)},
+                    'text': f'{dialect}/{title}',
+                    'paragraph': paragraph,
+                    'line_number': line,
+                })
+            paragraph += 1
+    return words
+
+def full_sort(words, hits, sort, within):
+    """Make the lines of all hits, sorted without the concordance.
+
+    Returns:
+        list of dicts as given by Concordance.line
+    """
+    def context(word, step):
+        found = []
+        i = word + step
+        while (len(found) < WIDTH and 0 <= i < len(words)
+               and words[i][within] == words[word][within]):
+            found.append(words[i]['string'])
+            i += step
+        return found
+
+    keys = {
+        'corpus': lambda word: word,
+        'keyword': lambda word: (words[word]['string'], word),
+        'left': lambda word: (context(word, -1), word),
+        'right': lambda word: (context(word, 1), word),
+    }
+    return [
+        {
+            'text': words[word]['text'],
+            'line_number': words[word]['line_number'],
+            'left': ' '.join(context(word, -1)[::-1]),
+            'keyword': words[word]['string'],
+            'right': ' '.join(context(word, 1)),
+        }
+            for word in sorted(hits, key=keys[sort])
+    ]
+
+def main(path=DEFAULT_CORPUS, size=PAGE_SIZE):
+    size = int(size)
+    corpus = Corpus(path)
+    concordance = Concordance(build_concordance(corpus), corpus.path)
+    # the word index is built in memory, not in the corpus directory
+    concordance._word_index = WordIndex(index_corpus(corpus))
+    words = scan_corpus(corpus)
+    failed = False
+
+    form = Counter(word['form'] for word in words).most_common(1)[0][0]
+    searches = [
+        (f'form {form}', concordance.find(form=form),
+         [i for i, word in enumerate(words) if word['form'] == form]),
+        (f'lemma {LEMMA}', concordance.find(lemma=LEMMA),
+         [i for i, word in enumerate(words) if LEMMA in word['lemmas']]),
+    ]
+    for description, hits, expected in searches:
+        if hits != expected:
+            print(f'FAILED: {description}: {len(hits)} hits, not {len(expected)}')
+            failed = True
+            continue
+        for sort in SORTS:
+            for within in ('text', 'paragraph'):
+                lines = []
+                npages = (len(hits) + size - 1) // size
+                for page in range(1, npages + 1):
+                    lines.extend(concordance.page(hits, page, size, sort, WIDTH, within))
+                if lines != full_sort(words, hits, sort, within):
+                    print(f'FAILED: {description}: pages sorted by {sort} within {within} '
+                          f'differ from a full sort')
+                    failed = True
+                if concordance.page(hits, npages + 1, size, sort, WIDTH, within):
+                    print(f'FAILED: {description}: page {npages + 1} of {npages} is not empty')
+                    failed = True
+        print(f'{description}: {len(hits)} hits, {len(SORTS) * 2} orders checked')
+
+    if failed:
+        return 1
+    print('√ the concordance pages give the fully sorted hits')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
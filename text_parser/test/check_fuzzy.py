@@ -0,0 +1,146 @@
+"""
+Check fuzzy searches against a brute-force scan of the keys.
+
+Run instructions:
+    python check_fuzzy.py [corpus_dir] [queries_per_dialect]
+
+The fuzzy index of a parsed corpus, by default parsed_texts/alpha, is
+built in memory. The check fails in any of these cases:
+
+- edit_distance differs from a plain Levenshtein distance, cut off
+  at its limit, on random strings
+- a search in any mode, narrowed down by the trigram index, does not
+  give the keys found by checking every key of the dialect
+- the words of a key are not the words of the corpus with that key
+- an unknown dialect is not refused
+
+Queries are forms of the corpus, some of them edited at random, so
+that they are a few edits away from their keys, and short queries,
+which are checked without the trigram index.
+"""
+
+import sys
+import random
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from formats import Corpus
+from fuzzy_index import FuzzyIndex, build_fuzzy_index, fuzzy_key, edit_distance, MODES
+
+DEFAULT_CORPUS = TEXT_PARSER.parent.joinpath('parsed_texts', 'alpha')
+QUERIES = 50
+DISTANCES = (1, 2)
+
+def levenshtein(a, b):
+    """Get the Levenshtein distance of two strings, without a limit."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j-1] + 1,
+                               previous[j-1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+def scan(keys, key, mode, distance):
+    """Find the keys that match a query key by checking every key."""
+    if not key:
+        return set()
+    if mode == 'exact':
+        return {k for k in keys if k == key}
+    if mode == 'substring':
+        return {k for k in keys if key in k}
+    return {k for k in keys if levenshtein(key, k) <= distance}
+
+def check_edit_distance(rand):
+    """Compare edit_distance with levenshtein on random strings.
+
+    Returns:
+        number of pairs that differ
+    """
+    bad = 0
+    for _ in range(2000):
+        a = ''.join(rand.choice('abc') for _ in range(rand.randrange(8)))
+        b = ''.join(rand.choice('abc') for _ in range(rand.randrange(8)))
+        limit = rand.randrange(4)
+        if edit_distance(a, b, limit) != min(levenshtein(a, b), limit + 1):
+            bad += 1
+    return bad
+
+def queries(forms, rand, n):
+    """Make queries from forms of a dialect, some edited at random."""
+    made = []
+    for form in rand.sample(forms, min(n, len(forms))):
+        for _ in range(rand.randrange(3)):
+            i = rand.randrange(len(form) + 1)
+            form = form[:i] + rand.choice(['', 'a', 'x', 'ʾ']) + form[i+1:]
+        made.append(form)
+    # too short for enough trigrams
+    made.extend(['x', 'xa', 'la', 'b'])
+    return made
+
+def main(path=DEFAULT_CORPUS, n=QUERIES):
+    corpus = Corpus(path)
+    data = build_fuzzy_index(corpus)
+    index = FuzzyIndex(data, corpus.path)
+    rand = random.Random(0)
+    failed = False
+
+    bad = check_edit_distance(rand)
+    if bad:
+        print(f'FAILED: edit_distance differs on {bad} pairs of strings')
+        failed = True
+
+    for dialect, dialect_index in index.dialects.items():
+        forms = sorted(set(f for key_forms in data['forms'][dialect].values() for f in key_forms))
+        searches = 0
+        for query in queries(forms, rand, int(n)):
+            key = fuzzy_key(query, dialect)
+            for mode in MODES:
+                for distance in DISTANCES if mode == 'similar' else (1,):
+                    found = set(dialect_index.search(query, mode, distance))
+                    expected = scan(dialect_index.key_list, key, mode, distance)
+                    searches += 1
+                    if found != expected:
+                        print(f'FAILED: {dialect}: {mode} {distance} {query!r} gives '
+                              f'{len(found)} keys, not {len(expected)}')
+                        failed = True
+        print(f'{dialect}: {searches} searches checked')
+
+    # the words of each key, straight from the texts
+    expected = {}
+    word = 0
+    for dialect, title in corpus.texts():
+        metadata, text_block = corpus.read(dialect, title)
+        for paragraph in text_block:
+            for element in paragraph:
+                if element.get('class') != 'word':
+                    continue
+                key = ''.join(letter.get('fuzzy', '') for letter in element['letters'])
+                if key:
+                    expected.setdefault((dialect, key), []).append(word)
+                word += 1
+    found = {
+        (dialect, key): words
+            for dialect, dialect_index in index.dialects.items()
+                for key, words in dialect_index.keys.items()
+    }
+    if found != expected:
+        print('FAILED: the words of the keys differ from those of the texts')
+        failed = True
+
+    try:
+        index.search('xa', dialect='no such dialect')
+        print('FAILED: an unknown dialect is not refused')
+        failed = True
+    except Exception:
+        pass
+
+    if failed:
+        return 1
+    print('√ fuzzy searches give the keys of a full scan')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
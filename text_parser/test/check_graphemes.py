@@ -0,0 +1,71 @@
+"""
+Check that the grapheme lexer gives the same tokens as the regex lexer.
+
+Run instructions:
+    python check_graphemes.py [texts_dir]
+
+Every .nena file under the texts directory, by default texts/ with
+all of its versions, is tokenized with NenaLexer and GraphemeLexer.
+The check fails if the two differ in any token, in the warnings they
+print for illegal characters, or in the errors they raise. The time
+each lexer took is reported as well.
+"""
+
+import io
+import sys
+import time
+import contextlib
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from nena_parser import NenaLexer, GraphemeLexer
+
+DEFAULT_TEXTS = TEXT_PARSER.parent.joinpath('texts')
+
+def tokenize(lexer_class, text):
+    """Tokenize a text, returning its tokens, printed output and time taken.
+
+    An error raised by the lexer ends the tokens and is added to the output.
+    """
+    output = io.StringIO()
+    tokens = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        try:
+            for t in lexer_class().tokenize(text):
+                tokens.append((t.type, t.value, t.index, t.end))
+        except Exception as error:
+            print(repr(error))
+    return tokens, output.getvalue(), time.perf_counter() - start
+
+def main(texts_dir=DEFAULT_TEXTS):
+    files = sorted(Path(texts_dir).glob('**/*.nena'))
+    regex_time = grapheme_time = 0
+    ntokens = 0
+    failed = []
+    for file in files:
+        text = file.read_text()
+        tokens, output, seconds = tokenize(NenaLexer, text)
+        regex_time += seconds
+        g_tokens, g_output, seconds = tokenize(GraphemeLexer, text)
+        grapheme_time += seconds
+        ntokens += len(tokens)
+        if tokens != g_tokens or output != g_output:
+            failed.append(file)
+            diff = next(
+                (i for i, (a, b) in enumerate(zip(tokens, g_tokens)) if a != b),
+                min(len(tokens), len(g_tokens)),
+            )
+            print(f'FAILED: {file.relative_to(texts_dir)} (first difference at token {diff})')
+
+    print(f'{len(files)} texts, {ntokens} tokens')
+    print(f'regex lexer: {regex_time:.2f}s, grapheme lexer: {grapheme_time:.2f}s')
+    if failed:
+        print(f'FAILED: {len(failed)} text(s) differ')
+        return 1
+    print('√ grapheme lexer gives the same tokens')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,103 @@
+"""
+Check that the parsings of a word do not depend on the words before it.
+
+Run instructions:
+    python check_lexicon.py [corpus_dir]
+
+The words of a parsed corpus, by default parsed_texts/alpha, are
+parsed with parse_word in corpus order, and again in reverse order
+with a memo cache small enough that forms are dropped from it and
+made again. The check fails if a word gets different parsings in the
+two runs, or different from the records made directly from the
+lexicon without a cache, or if the lexicon changed. The hit rates of
+the memo cache and the time taken are reported as well.
+"""
+
+import sys
+import json
+import time
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+import lexicon
+from lexicon import parse_word, make_parsings, normalize_nena
+from formats import Corpus
+
+DEFAULT_CORPUS = TEXT_PARSER.parent.joinpath('parsed_texts', 'alpha')
+SMALL_CACHE = 64
+
+def corpus_words(path):
+    """Get the (string, dialect) of every word of a parsed corpus."""
+    corpus = Corpus(path)
+    words = []
+    for dialect, title in corpus.texts():
+        metadata, text_block = corpus.read(dialect, title)
+        words.extend(
+            (element['string'], dialect)
+                for paragraph in text_block for element in paragraph
+                    if element.get('class') == 'word'
+        )
+    return words
+
+def lexicon_json():
+    return json.dumps([lexicon.dialect2lexicon, lexicon.dialect2index], sort_keys=True)
+
+def parse_all(words, cache_size):
+    """Parse words with fresh memo caches of a size.
+
+    Returns:
+        list of parsings as plain dicts, time taken, and cache stats
+    """
+    lexicon.dialect2cache.clear()
+    lexicon.CACHE_SIZE = cache_size
+    start = time.perf_counter()
+    results = [parse_word(string, dialect) for string, dialect in words]
+    elapsed = time.perf_counter() - start
+    return [[dict(p) for p in parsings] for parsings in results], elapsed, lexicon.cache_stats()
+
+def hit_rates(stats):
+    return ', '.join(
+        f"{dialect} {s['hits'] / (s['hits'] + s['misses']):.1%}"
+            for dialect, s in stats.items()
+    )
+
+def main(path=DEFAULT_CORPUS):
+    words = corpus_words(Path(path))
+    before = lexicon_json()
+    cache_size = lexicon.CACHE_SIZE
+
+    forward, forward_time, forward_stats = parse_all(words, cache_size)
+    backward, backward_time, backward_stats = parse_all(words[::-1], SMALL_CACHE)
+    backward.reverse()
+
+    start = time.perf_counter()
+    direct = [
+        [dict(p) for p in make_parsings(normalize_nena(string), dialect)]
+            if dialect in lexicon.dialect2index else []
+            for string, dialect in words
+    ]
+    direct_time = time.perf_counter() - start
+    lexicon.CACHE_SIZE = cache_size
+
+    print(f'{len(words)} words')
+    print(f'cache of {cache_size}: {forward_time:.3f}s, hits {hit_rates(forward_stats)}')
+    print(f'cache of {SMALL_CACHE}, reversed: {backward_time:.3f}s, hits {hit_rates(backward_stats)}')
+    print(f'no cache: {direct_time:.3f}s')
+
+    failed = False
+    for (string, dialect), a, b, c in zip(words, forward, backward, direct):
+        if not a == b == c:
+            print(f'FAILED: {dialect} {string!r} has parsings {a} and {b} and {c}')
+            failed = True
+            break
+    if lexicon_json() != before:
+        print('FAILED: the lexicon was changed by parsing')
+        failed = True
+    if failed:
+        return 1
+    print('√ parsings do not depend on the order of the words')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,101 @@
+"""
+Check that lint finds the errors the parser finds.
+
+Run instructions:
+    python check_lint.py [texts_dir] [edits_per_text]
+
+Every text of the corpus, by default texts/alpha, should lint without
+errors. Copies of every third text are then broken by random edits:
+characters are deleted or inserted, or the text is cut short. For
+each broken copy, the check fails if lint finds no error where the
+parser fails, finds an error where the parser does not, or if its
+first error is not the parser's error at the same position. Illegal
+characters are left out, since the parser skips them too. The time
+to lint the corpus is reported.
+"""
+
+import io
+import re
+import sys
+import time
+import random
+import contextlib
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from nena_parser import NenaLexer, NenaParser
+from lint import LintLexer, lint_tokens, lint_files
+
+DEFAULT_TEXTS = TEXT_PARSER.parent.joinpath('texts', 'alpha')
+EDITS = 10
+INSERTS = ['\n\n', '\n', '.', 'a::b\n', '(3) ', 'x', '<E:', '>', '', 'speakers:: x']
+
+def edit(text, rand):
+    """Break a text by a random edit."""
+    i = rand.randrange(len(text))
+    choice = rand.randrange(4)
+    if choice == 0:
+        return text[:i] + text[i+1:]
+    if choice == 3:
+        return text[:i]
+    return text[:i] + rand.choice(INSERTS) + text[i:]
+
+def first_error(dialect, text):
+    """Get the error message of the parser, or None."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            NenaParser(dialect).parse(NenaLexer().tokenize(text))
+        except Exception as error:
+            return str(error)
+    return None
+
+def agrees(error, lint_errors):
+    """Tell whether the first lint error is the parser's error."""
+    if error is None:
+        return not lint_errors
+    if not lint_errors:
+        return False
+    index, message = lint_errors[0]
+    # 'unexpected TYPE (value) at index N'
+    match = re.search(r'^(unexpected \S+).* at index (\d+)$', error, re.S)
+    if match:
+        return index == int(match.group(2)) and message.startswith(match.group(1))
+    return error in message
+
+def main(path=DEFAULT_TEXTS, edits=EDITS):
+    files = sorted(Path(path).glob('*/*.nena'))
+    start = time.perf_counter()
+    errors = lint_files(files)
+    print(f'{len(files)} texts linted in {time.perf_counter() - start:.2f}s')
+    failed = False
+    for error in errors:
+        print(f"FAILED: {error['file']}:{error['line']}:{error['column']}: {error['message']}")
+        failed = True
+
+    rand = random.Random(0)
+    checked = 0
+    for file in files[::3]:
+        text = file.read_text()
+        for _ in range(int(edits)):
+            broken = edit(text, rand)
+            lexer = LintLexer()
+            lint_errors = lint_tokens(list(lexer.tokenize(broken)), len(broken))
+            lint_errors = sorted(lint_errors + [
+                e for e in lexer.errors if not e[1].startswith('illegal character')
+            ])
+            error = first_error(file.parent.name, broken)
+            checked += 1
+            if not agrees(error, lint_errors):
+                print(f'FAILED: {file.parent.name}/{file.name}, edit {checked}: '
+                      f'parser {error!r}, lint {lint_errors[:1]}')
+                failed = True
+    print(f'{checked} broken texts checked against the parser')
+
+    if failed:
+        return 1
+    print('√ lint finds the errors of the parser')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,98 @@
+"""
+Check that incremental builds only parse texts whose inputs changed.
+
+Run instructions:
+    python check_manifest.py [nena_file]
+
+A copy of a text is built in a temporary directory, with a copy of
+config.json. The check fails if a second build parses the text again,
+either as it is or after the keys of the config that do not change
+the output, jobs and tf_outdir, are edited, or if a build after the
+text itself is edited does not parse it again.
+
+The standards hash of a dialect is also taken of a copy of the
+project's inputs and config.json, which fails the check if it changes
+when jobs is edited.
+"""
+
+import io
+import sys
+import json
+import shutil
+import tempfile
+import contextlib
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+import build
+from manifest import hash_dialect, SHARED_INPUTS, DIALECT_INPUTS, PROJECT
+
+DEFAULT_TEXT = TEXT_PARSER.parent.joinpath('texts/alpha/Barwar/A Hundred Gold Coins.nena')
+
+def run_build(config, indir, outdir):
+    """Build the corpus, and get the line that tells how many texts were parsed."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        build.main(['--config', str(config), str(indir), str(outdir)])
+    return next(line for line in output.getvalue().split('\n') if line.startswith('parsing '))
+
+def check_config_hash(dialect):
+    """Tell whether the standards hash of a dialect ignores config.json."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project = Path(tmpdir)
+        patterns = SHARED_INPUTS + [p.format(dialect=dialect) for p in DIALECT_INPUTS]
+        files = [file for pattern in patterns for file in PROJECT.glob(pattern)]
+        for file in files + [build.CONFIG]:
+            copy = project.joinpath(file.relative_to(PROJECT))
+            copy.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(file, copy)
+        before = hash_dialect(dialect, project)
+        config = project.joinpath(build.CONFIG.relative_to(PROJECT))
+        settings = json.loads(config.read_text())
+        settings['jobs'] = settings.get('jobs', 1) + 1
+        config.write_text(json.dumps(settings, indent=4))
+        return hash_dialect(dialect, project) == before
+
+def main(file=DEFAULT_TEXT):
+    file = Path(file)
+    failed = False
+    if not check_config_hash(file.parent.name):
+        print('FAILED: the standards hash changes with the jobs of config.json')
+        failed = True
+    with tempfile.TemporaryDirectory() as tmpdir:
+        indir = Path(tmpdir, 'texts')
+        outdir = Path(tmpdir, 'parsed')
+        copy = indir.joinpath(file.parent.name, file.name)
+        copy.parent.mkdir(parents=True)
+        shutil.copy(file, copy)
+        config = Path(tmpdir, 'config.json')
+        shutil.copy(build.CONFIG, config)
+        settings = json.loads(config.read_text())
+
+        def edit_config(**changes):
+            settings.update(changes)
+            config.write_text(json.dumps(settings, indent=4))
+
+        steps = [
+            ('first build', lambda: None, 1),
+            ('nothing changed', lambda: None, 0),
+            ('jobs changed', lambda: edit_config(jobs=settings.get('jobs', 1) + 1), 0),
+            ('tf_outdir changed', lambda: edit_config(tf_outdir='../tf/other'), 0),
+            ('text changed', lambda: copy.write_text(copy.read_text() + '\n'), 1),
+        ]
+        for description, change, expected in steps:
+            change()
+            line = run_build(config, indir, outdir)
+            print(f'{description}: {line}')
+            if line != f'parsing {expected} of 1 texts':
+                print(f'FAILED: {description}: expected parsing {expected} of 1 texts')
+                failed = True
+
+    if failed:
+        return 1
+    print('√ only texts whose inputs changed are parsed again')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,111 @@
+"""
+Check that the compact objects of elements.py give the same output
+as the parser's dicts, with less memory.
+
+Run instructions:
+    python check_objects.py [texts_dir]
+
+Every .nena text in texts_dir, by default texts/alpha, is parsed with
+NenaParser(dialect) and NenaParser(dialect, objects=True), and the
+check fails if the texts differ, or if their JSON in any format
+version is not the same. The objects are also checked to survive
+pickling, as they do when handed between processes.
+
+Then the texts are parsed and kept in memory both ways, and the time
+and peak memory of each are reported. Memory is measured on the first
+MEMORY_TEXTS texts only, since tracemalloc slows parsing down a lot.
+The check fails if the objects take more memory than the dicts.
+"""
+
+import io
+import sys
+import time
+import pickle
+import contextlib
+import tracemalloc
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from nena_parser import NenaLexer, NenaParser
+from formats import encode_text, ParsingTable
+
+DEFAULT_TEXTS = TEXT_PARSER.parent.joinpath('texts', 'alpha')
+MEMORY_TEXTS = 20
+
+def parse(text, dialect, objects):
+    # the lexer prints illegal characters
+    with contextlib.redirect_stdout(io.StringIO()):
+        return NenaParser(dialect, objects).parse(NenaLexer().tokenize(text))
+
+def encodings(parsed):
+    """Get the JSON of a parsed text in each format version."""
+    return [
+        encode_text(parsed, 1),
+        encode_text(parsed, 2),
+        encode_text(parsed, 3, ParsingTable()),
+    ]
+
+def parse_all(texts, objects):
+    """Parse texts and keep them."""
+    return [parse(text, dialect, objects) for dialect, text in texts]
+
+def peak_memory(texts, objects):
+    """Get the peak memory of parsing texts and keeping them, in MB."""
+    tracemalloc.start()
+    parsed = parse_all(texts, objects)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+def parse_time(texts, objects):
+    start = time.perf_counter()
+    parse_all(texts, objects)
+    return time.perf_counter() - start
+
+def main(path=DEFAULT_TEXTS):
+    failed = False
+    texts = []
+    for file in sorted(Path(path).glob('*/*.nena')):
+        dialect = file.parent.name
+        text = file.read_text()
+        try:
+            dicts = parse(text, dialect, False)
+        except Exception:
+            continue
+        texts.append((dialect, text))
+        objects = parse(text, dialect, True)
+        name = f'{dialect}/{file.name}'
+        if objects != dicts:
+            print(f'FAILED: {name} differs as objects')
+            failed = True
+        elif encodings(objects) != encodings(dicts):
+            print(f'FAILED: {name} gives different JSON as objects')
+            failed = True
+        elif pickle.loads(pickle.dumps(objects)) != objects:
+            print(f'FAILED: {name} changes when pickled')
+            failed = True
+    print(f'{len(texts)} texts compared')
+
+    # tracemalloc slows parsing down, so memory is measured
+    # on a part of the corpus, and time on all of it without
+    sample = texts[:MEMORY_TEXTS]
+    dict_peak = peak_memory(sample, False)
+    object_peak = peak_memory(sample, True)
+    dict_time = parse_time(texts, False)
+    object_time = parse_time(texts, True)
+    print(f'{len(sample)} texts kept as dicts: peak {dict_peak:.1f}MB; '
+          f'as objects: peak {object_peak:.1f}MB')
+    print(f'{len(texts)} texts parsed to dicts in {dict_time:.2f}s; '
+          f'to objects in {object_time:.2f}s')
+    if object_peak > dict_peak:
+        print('FAILED: objects take more memory than dicts')
+        failed = True
+
+    if failed:
+        return 1
+    print('√ objects give the same texts in less memory')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,132 @@
+"""
+Check the queries of the word index against a scan of the corpus.
+
+Run instructions:
+    python check_queries.py [corpus_dir]
+
+The word index of a parsed corpus, by default parsed_texts/alpha, is
+built in memory. The pairs of every word are also gathered straight
+from its parsings in the JSON texts, along with its place in the
+corpus. The check fails in any of these cases:
+
+- a term does not give the words whose parsings have its pair
+- a query does not give the set made with Python's set operators,
+  with NOT binding more tightly than AND, and AND more tightly than OR
+- a word is not located at its text, line number and position
+- a malformed query does not raise QueryError
+"""
+
+import re
+import sys
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from formats import Corpus
+from word_index import WordIndex, QueryError, index_corpus, SKIP_KEYS
+
+DEFAULT_CORPUS = TEXT_PARSER.parent.joinpath('parsed_texts', 'alpha')
+
+TERMS = {
+    'A': ('pos', 'NOUN'),
+    'B': ('gn', 'F'),
+    'C': ('nu', 'PL'),
+    'D': ('pos', 'VERB'),
+    'E': ('lemma', 'xa'),
+}
+
+# queries in the terms above, and the same in Python, for
+# the sets of words A to E and the set of all words U
+QUERIES = [
+    ('A', 'A'),
+    ('NOT A', 'U - A'),
+    ('NOT NOT A', 'A'),
+    ('A AND B', 'A & B'),
+    ('A OR B', 'A | B'),
+    ('A AND B OR C', '(A & B) | C'),
+    ('A OR B AND C', 'A | (B & C)'),
+    ('(A OR B) AND C', '(A | B) & C'),
+    ('NOT A AND B', '(U - A) & B'),
+    ('NOT (A AND B)', 'U - (A & B)'),
+    ('A AND NOT (B OR C)', 'A & (U - (B | C))'),
+    ('A OR NOT B AND C OR D', 'A | ((U - B) & C) | D'),
+    ('D OR E AND NOT A AND NOT B', 'D | (E & (U - A) & (U - B))'),
+]
+
+MALFORMED = ['', 'pos=VERB AND', 'pos=VERB )', '(pos=VERB', 'NOT', 'pos=', 'pos', 'AND pos=VERB']
+
+def scan_corpus(corpus):
+    """Gather the pairs and the place of every word of a corpus.
+
+    Returns:
+        list of (set of (feature, value) pairs, (text, line_number,
+        position)) tuples, one per word, in corpus order
+    """
+    words = []
+    for dialect, title in corpus.texts():
+        metadata, text_block = corpus.read(dialect, title)
+        line = None
+        position = 0
+        for paragraph in text_block:
+            for element in paragraph:
+                if element.get('class') != 'word':
+                    if 'line_number' in element:
+                        line = int(element['line_number'])
+                    continue
+                pairs = set()
+                for parsing in corpus.get_parsings(element):
+                    for feature, values in parsing.items():
+                        if feature in SKIP_KEYS:
+                            continue
+                        for value in values if isinstance(values, list) else [values]:
+                            pairs.add((feature, str(value)))
+                words.append((pairs, (f'{dialect}/{title}', line, position)))
+                position += 1
+    return words
+
+def main(path=DEFAULT_CORPUS):
+    corpus = Corpus(path)
+    index = WordIndex(index_corpus(corpus))
+    words = scan_corpus(corpus)
+    failed = False
+
+    sets = {
+        name: {word for word, (pairs, place) in enumerate(words) if pair in pairs}
+            for name, pair in TERMS.items()
+    }
+    sets['U'] = set(range(len(words)))
+    for name, (feature, value) in TERMS.items():
+        if set(index.term(feature, value)) != sets[name]:
+            print(f'FAILED: {feature}={value} gives {len(index.term(feature, value))} '
+                  f'words, not {len(sets[name])}')
+            failed = True
+
+    for query, expression in QUERIES:
+        query = re.sub(r'\b[A-E]\b', lambda m: '='.join(TERMS[m.group()]), query)
+        expected = eval(expression, {}, sets)
+        found = set(index.query(query))
+        if found != expected:
+            print(f'FAILED: {query!r} gives {len(found)} words, not {len(expected)}')
+            failed = True
+    print(f'{len(QUERIES)} queries checked on {len(words)} words')
+
+    places = [place for pairs, place in words]
+    if index.hits(range(len(words))) != places:
+        print('FAILED: words are not located at their text, line and position')
+        failed = True
+
+    for query in MALFORMED:
+        try:
+            index.query(query)
+        except QueryError:
+            continue
+        print(f'FAILED: {query!r} does not raise QueryError')
+        failed = True
+
+    if failed:
+        return 1
+    print('√ the word index gives the words of the corpus')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
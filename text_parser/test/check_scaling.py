@@ -0,0 +1,61 @@
+"""
+Check that parsing time grows linearly with the length of a text.
+
+Run instructions:
+    python check_scaling.py [nena_file]
+
+A text is enlarged 10 and 100 times, by making each paragraph that
+many times longer, and both are parsed. If the parser is linear,
+the 100x text takes about 10 times as long as the 10x text; if it
+is quadratic, it takes about 100 times as long. The check fails
+when it takes more than 20 times as long.
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from nena_parser import NenaLexer, NenaParser
+
+DEFAULT_TEXT = TEXT_PARSER.parent.joinpath('texts/alpha/Barwar/A Hundred Gold Coins.nena')
+MAX_RATIO = 20
+
+def enlarge(text, n):
+    """Make each paragraph of a NENA text n times longer."""
+    header, body = re.split(r'\n\s*\n', text, maxsplit=1)
+    paragraphs = re.split(r'\n\s*\n', body.strip())
+    body = '\n\n'.join(' '.join([para] * n) for para in paragraphs)
+    return f'{header}\n\n{body}\n'
+
+def time_parse(text, dialect):
+    """Time the parse of a text, in seconds."""
+    lexer = NenaLexer()
+    parser = NenaParser(dialect)
+    start = time.perf_counter()
+    parser.parse(lexer.tokenize(text))
+    return time.perf_counter() - start
+
+def main(file=DEFAULT_TEXT):
+    file = Path(file)
+    text = file.read_text()
+    dialect = file.parent.name
+
+    # warm up caches, so that they do not count for the small text
+    time_parse(text, dialect)
+
+    time10 = min(time_parse(enlarge(text, 10), dialect) for i in range(3))
+    time100 = time_parse(enlarge(text, 100), dialect)
+    ratio = time100 / time10
+    print(f'10x: {time10:.3f}s, 100x: {time100:.3f}s, ratio: {ratio:.1f}')
+
+    if ratio > MAX_RATIO:
+        print('FAILED: parsing time grows faster than text length')
+        return 1
+    print('√ parsing time grows linearly')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,110 @@
+"""
+Check that parsing a text as a stream gives the same result as a
+whole parse, with less memory.
+
+Run instructions:
+    python check_stream.py [texts_dir]
+
+Every .nena text in texts_dir, by default texts/alpha, is parsed with
+NenaParser.parse and with NenaParser.parse_stream, and the check fails
+if the attributes and paragraphs differ, or if one fails and the other
+does not, or they fail with different errors.
+
+Then a text is made 50 times longer, by repeating its paragraphs, and
+the peak memory of counting its words is measured with both. The
+stream only holds one paragraph at a time, so the check fails if its
+peak is not at most a fifth of that of the whole parse.
+"""
+
+import io
+import re
+import sys
+import contextlib
+import tracemalloc
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from nena_parser import NenaLexer, NenaParser
+
+DEFAULT_TEXTS = TEXT_PARSER.parent.joinpath('texts', 'alpha')
+LONG_TEXT = TEXT_PARSER.parent.joinpath('texts/alpha/Barwar/A Hundred Gold Coins.nena')
+REPEAT = 50
+MAX_RATIO = 0.2
+
+def repeat_paragraphs(text, n):
+    """Make a NENA text with its paragraphs n times over."""
+    header, body = re.split(r'\n\s*\n', text, maxsplit=1)
+    return f'{header}\n\n' + '\n\n'.join([body.strip()] * n) + '\n'
+
+def parse_whole(text, dialect):
+    """Parse a text with parse, giving the result or the error."""
+    try:
+        return NenaParser(dialect).parse(NenaLexer().tokenize(text))
+    except Exception as error:
+        return repr(error)
+
+def parse_stream(text, dialect):
+    """Parse a text with parse_stream, in the shape given by parse."""
+    try:
+        attributes, *text_block = NenaParser(dialect).parse_stream(NenaLexer().tokenize(text))
+        return [attributes, text_block]
+    except Exception as error:
+        return repr(error)
+
+def count_words(paragraphs):
+    return sum(
+        1 for paragraph in paragraphs for element in paragraph
+            if element.get('class') == 'word'
+    )
+
+def peak_memory(count):
+    """Get the words counted, and the peak memory in MB."""
+    tracemalloc.start()
+    words = count()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return words, peak / 2**20
+
+def main(path=DEFAULT_TEXTS):
+    failed = False
+    files = sorted(Path(path).glob('*/*.nena'))
+    for file in files:
+        text = file.read_text()
+        dialect = file.parent.name
+        # the lexer prints illegal characters
+        with contextlib.redirect_stdout(io.StringIO()):
+            whole = parse_whole(text, dialect)
+            stream = parse_stream(text, dialect)
+        if whole != stream:
+            print(f'FAILED: {file.parent.name}/{file.name} differs when streamed')
+            failed = True
+    print(f'{len(files)} texts compared')
+
+    text = repeat_paragraphs(LONG_TEXT.read_text(), REPEAT)
+    dialect = LONG_TEXT.parent.name
+    parse_whole(text, dialect)
+    whole_words, whole_peak = peak_memory(
+        lambda: count_words(NenaParser(dialect).parse(NenaLexer().tokenize(text))[1])
+    )
+    def count_stream():
+        blocks = NenaParser(dialect).parse_stream(NenaLexer().tokenize(text))
+        attributes = next(blocks)
+        return count_words(blocks)
+    stream_words, stream_peak = peak_memory(count_stream)
+    print(f'{whole_words} words: parse peak {whole_peak:.1f}MB, '
+          f'parse_stream peak {stream_peak:.1f}MB')
+    if whole_words != stream_words:
+        print('FAILED: parse_stream gives a different number of words')
+        failed = True
+    if stream_peak > whole_peak * MAX_RATIO:
+        print('FAILED: parse_stream does not save memory')
+        failed = True
+
+    if failed:
+        return 1
+    print('√ parse_stream gives the same texts in less memory')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
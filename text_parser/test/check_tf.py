@@ -0,0 +1,105 @@
+"""
+Check that the Text-Fabric export loads and gives back the corpus.
+
+Run instructions:
+    python check_tf.py [corpus_dir]
+
+The texts of a parsed corpus, by default parsed_texts/alpha, are
+exported to a temporary directory and loaded with Text-Fabric. The
+check fails in any of these cases:
+
+- the export does not load
+- a line is not inside exactly one paragraph
+- a paragraph is not inside exactly one text
+- a word is not inside exactly one line
+- the words of a text, or its printed text, differ from the corpus
+
+Needs the text-fabric package.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from formats import Corpus
+from tf_export import export_tf
+from tf.fabric import Fabric
+
+DEFAULT_CORPUS = TEXT_PARSER.parent.joinpath('parsed_texts', 'alpha')
+
+def corpus_words(corpus, dialect, title):
+    """Get the words of a text as dicts with string, begin and end."""
+    metadata, text_block = corpus.read(dialect, title)
+    return [
+        {
+            'string': element['string'],
+            'begin': ''.join(c['decomposed_string'] for c in element['beginnings']),
+            'end': ''.join(c['decomposed_string'] for c in element['endings']),
+        }
+            for paragraph in text_block
+                for element in paragraph
+                    if element.get('class') == 'word'
+    ]
+
+def check_nesting(api):
+    """Check that each section is inside exactly one of the next larger type.
+
+    Returns:
+        list of error messages
+    """
+    F, L = api.F, api.L
+    errors = []
+    for inner, outer in (('line', 'paragraph'), ('paragraph', 'text'), ('word', 'line')):
+        bad = [node for node in F.otype.s(inner) if len(L.u(node, outer)) != 1]
+        if bad:
+            errors.append(f'{len(bad)} {inner} nodes are not in one {outer}, e.g. {bad[0]}')
+    return errors
+
+def main(path=DEFAULT_CORPUS):
+    corpus = Corpus(path)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmpdir:
+        export_tf(corpus, Path(tmpdir))
+        api = Fabric(locations=tmpdir, silent='deep').loadAll(silent='deep')
+        if not api:
+            print('FAILED: the export does not load')
+            return 1
+        F, L, T = api.F, api.L, api.T
+
+        for error in check_nesting(api):
+            print(f'FAILED: {error}')
+            failed = True
+
+        texts = F.otype.s('text')
+        if len(texts) != len(corpus.texts()):
+            print(f'FAILED: {len(texts)} texts, not {len(corpus.texts())}')
+            return 1
+        for node, (dialect, title) in zip(texts, corpus.texts()):
+            if (F.dialect.v(node), F.title.v(node)) != (dialect, title):
+                print(f'FAILED: text {node} is {F.dialect.v(node)}/{F.title.v(node)}, not {dialect}/{title}')
+                failed = True
+                continue
+            expected = corpus_words(corpus, dialect, title)
+            words = [
+                {'string': F.string.v(word), 'begin': F.begin.v(word) or '', 'end': F.end.v(word) or ''}
+                    for word in L.d(node, 'word')
+            ]
+            if words != expected:
+                print(f'FAILED: {dialect}/{title}: the words differ')
+                failed = True
+                continue
+            printed = ''.join(w['begin'] + w['string'] + w['end'] for w in expected)
+            if T.text(L.d(node, 'word')) != printed:
+                print(f'FAILED: {dialect}/{title}: the printed text differs')
+                failed = True
+        print(f'{len(texts)} texts checked')
+
+    if failed:
+        return 1
+    print('√ the Text-Fabric export gives back the corpus')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,93 @@
+"""
+Check that the watcher writes the same texts as a full parse, while
+parsing only the paragraphs that changed.
+
+Run instructions:
+    python check_watch.py [nena_file]
+
+A copy of a text is watched in a temporary directory and edited a
+few times: a paragraph is changed, a parse error is made and fixed,
+the attributes are changed and paragraphs are swapped and repeated.
+After each save, the check fails if the watcher's output differs from
+that of a full parse of the text in the same format, or if it parsed
+more blocks than were changed. The time of each save is reported.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+TEXT_PARSER = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TEXT_PARSER))
+from nena_parser import NenaLexer, NenaParser
+from formats import encode_text
+from watch import Watcher
+
+DEFAULT_TEXT = TEXT_PARSER.parent.joinpath('texts/alpha/Barwar/Gozali and Nozali.nena')
+
+def edits(text):
+    """Make the edits of the check.
+
+    Yields:
+        3-tuples of a description, the edited text, and the most
+        blocks that should be parsed, or None for a parse error
+    """
+    yield 'first save', text, len(text.split('\n\n'))
+    paragraphs = text.split('\n\n')
+    changed = paragraphs[:3] + ['xa, ' + paragraphs[3]] + paragraphs[4:]
+    yield 'one paragraph changed', '\n\n'.join(changed), 1
+    broken = changed[:3] + ['xa xa'] + changed[3:]
+    yield 'parse error', '\n\n'.join(broken), None
+    yield 'error fixed', '\n\n'.join(changed), 0
+    changed[0] = changed[0].replace('::', ' :: ', 1)
+    yield 'attributes changed', '\n\n'.join(changed), 1
+    swapped = changed[:3] + [changed[4], changed[3], changed[4]] + changed[5:]
+    yield 'paragraphs swapped and repeated', '\n\n'.join(swapped), 0
+
+def main(file=DEFAULT_TEXT):
+    file = Path(file)
+    failed = False
+    for version in (1, 2):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            indir = Path(tmpdir, 'texts')
+            outdir = Path(tmpdir, 'parsed')
+            copy = indir.joinpath(file.parent.name, file.name)
+            copy.parent.mkdir(parents=True)
+            shutil.copy(file, copy)
+            watcher = Watcher(indir, outdir, version)
+            outfile = outdir.joinpath(file.parent.name, file.stem + '.json')
+
+            for description, text, most in edits(file.read_text()):
+                copy.write_text(text)
+                # mtimes can be too coarse to tell saves apart
+                now = time.time_ns()
+                os.utime(copy, ns=(now, now))
+                start = time.perf_counter()
+                message = dict(watcher.check()).get(copy, '')
+                elapsed = time.perf_counter() - start
+                print(f'format {version}, {description}: {elapsed:.2f}s, {message}')
+                if most is None:
+                    if not message.startswith('✗'):
+                        print(f'FAILED: format {version}, {description}: no error')
+                        failed = True
+                    continue
+                expected = encode_text(NenaParser(file.parent.name).parse(NenaLexer().tokenize(text)), version)
+                if outfile.read_text() != expected:
+                    print(f'FAILED: format {version}, {description}: output differs from a full parse')
+                    failed = True
+                # '√ N of M blocks parsed in S'
+                parsed = int(message.split()[1]) if message.startswith('√') else None
+                if parsed is None or parsed > most:
+                    print(f'FAILED: format {version}, {description}: {parsed} blocks parsed, not {most}')
+                    failed = True
+
+    if failed:
+        return 1
+    print('√ the watcher gives the same texts, parsing only what changed')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
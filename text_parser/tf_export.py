@@ -0,0 +1,308 @@
+"""
+Export the parsed NENA corpus to Text-Fabric.
+
+Run instructions:
+    python tf_export.py [indir] [outdir]
+
+By default, the parsed texts of the version in config.json are read
+from parsed_texts/<version>, and the Text-Fabric feature files are
+written to the config's tf_outdir.
+
+Text-Fabric numbers the nodes of a corpus type by type: first all of
+the slots, then the nodes of each other type. Here the slots are
+letters, followed by words, lines, paragraphs and texts:
+
+    letter: string, begin, end, phonetic features, transcriptions
+    word: string, begin, end, lemma, speaker, lang, transcriptions
+    line: line_number, timestamp
+    paragraph: number
+    text: title, dialect and the other metadata of the text
+
+A word's `begin` and `end` are the strings of its beginnings and
+endings, e.g. '⁺' or ',ˈ '. They are also given to its first and
+last letter, so that the text can be printed from the letters.
+
+Texts are read and exported one at a time. Since the number of a
+word node depends on the number of letters in the whole corpus, the
+nodes and features of each type are first streamed to temporary
+files, numbered within their type, and the feature files are put
+together at the end, with the numbers shifted. The memory used does
+not grow with the size of the corpus.
+"""
+
+import json
+import argparse
+import datetime
+import tempfile
+from pathlib import Path
+
+from formats import Corpus
+from characters import get_matrix
+
+TEXT_PARSER = Path(__file__).resolve().parent
+PROJECT = TEXT_PARSER.parent
+CONFIG = TEXT_PARSER.joinpath('config.json')
+
+# node types in the order of their node numbers; letters are the slots
+NODE_TYPES = ('letter', 'word', 'line', 'paragraph', 'text')
+
+# features with integer values; all others are strings
+INT_FEATURES = {'line_number', 'number'}
+
+# keys of character records that are not exported as features
+SKIP_CHAR_KEYS = {'decomposed_regex', 'decomposed_string'}
+
+def tf_value(value):
+    """Escape a value for a Text-Fabric feature file."""
+    return (
+        str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+    )
+
+def tf_header(kind, value_type):
+    """Get the header lines of a Text-Fabric file."""
+    date = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return (
+        f'@{kind}\n'
+        f'@valueType={value_type}\n'
+        f'@writtenBy=nena_corpus tf_export.py\n'
+        f'@dateWritten={date}\n'
+        '\n'
+    )
+
+def tf_metadata(value):
+    """Format a metadata value as a string, as in the .nena source,
+    e.g. speakers as 'GK=Geoffrey Khan, YD=Yulia Davudi'."""
+    if isinstance(value, dict):
+        return ', '.join(f'{k}={v}' for k, v in value.items())
+    return value
+
+def slot_range(start, end):
+    return str(start) if start == end else f'{start}-{end}'
+
+class NodeType:
+    """Nodes and features of one node type, streamed to temporary files.
+
+    Nodes are numbered from 1 within their type. Features are
+    written as 'number<tab>value' lines, and only for nodes that
+    have a value for them.
+    """
+
+    def __init__(self, name, tmpdir):
+        self.name = name
+        self.tmpdir = tmpdir
+        self.count = 0
+        self.oslots = open(tmpdir.joinpath(f'{name}.oslots'), 'w')
+        self.features = {}
+
+    def add(self, slots, features):
+        """Add a node.
+
+        Arguments:
+            slots (tuple): first and last slot of the node,
+                or None for a slot
+            features (dict): feature values of the node
+
+        Returns:
+            number of the node within its type
+        """
+        self.count += 1
+        if slots is not None:
+            self.oslots.write(slot_range(*slots) + '\n')
+        for feature, value in features.items():
+            if value is None or value == '':
+                continue
+            outfile = self.features.get(feature)
+            if outfile is None:
+                outfile = self.features[feature] = open(
+                    self.tmpdir.joinpath(f'{self.name}.{feature}'), 'w'
+                )
+            outfile.write(f'{self.count}\t{tf_value(value)}\n')
+        return self.count
+
+    def close(self):
+        self.oslots.close()
+        for outfile in self.features.values():
+            outfile.close()
+
+class TFWriter:
+    """Streams parsed texts into Text-Fabric feature files."""
+
+    def __init__(self, tmpdir):
+        self.types = {name: NodeType(name, tmpdir) for name in NODE_TYPES}
+        self.letters = self.types['letter']
+
+    def add_letter(self, char, **features):
+        for key, value in char.items():
+            if key not in SKIP_CHAR_KEYS:
+                features[key] = value
+        return self.letters.add(None, {'string': char['decomposed_string'], **features})
+
+    def add_text(self, parsed, get_parsings=None):
+        """Add the nodes of a text in the parser's output shape.
+
+        Arguments:
+            parsed (list): [metadata, text_block] of the text
+            get_parsings (callable): gets the parsing records of
+                a word, e.g. Corpus.get_parsings; by default, they
+                are taken from the word as they are
+        """
+        metadata, text_block = parsed
+        dialect = metadata.get('dialect')
+        matrix = get_matrix(dialect)
+        words, lines, paragraphs = (self.types[t] for t in ('word', 'line', 'paragraph'))
+        text_start = self.letters.count + 1
+        speaker = lang = None
+        line = {'line_number': 0}
+        line_start = text_start
+
+        def end_line():
+            if self.letters.count >= line_start:
+                lines.add((line_start, self.letters.count), line)
+
+        for number, paragraph in enumerate(text_block, 1):
+            paragraph_start = self.letters.count + 1
+            for element in paragraph:
+                if element.get('class') != 'word':
+                    if 'line_number' in element:
+                        end_line()
+                        line_start = self.letters.count + 1
+                        line = {
+                            'line_number': int(element['line_number']),
+                            'timestamp': element.get('timestamp'),
+                        }
+                    speaker = element.get('speaker', speaker)
+                    continue
+
+                for char in element['beginnings']:
+                    if char.get('class') == 'LANG_START':
+                        lang = char['lang']
+                begin = ''.join(c['decomposed_string'] for c in element['beginnings'])
+                end = ''.join(c['decomposed_string'] for c in element['endings'])
+                letters = element['letters']
+                word_start = self.letters.count + 1
+                for i, char in enumerate(letters):
+                    self.add_letter(
+                        char,
+                        begin=begin if i == 0 else None,
+                        end=end if i == len(letters) - 1 else None,
+                    )
+                parsings = get_parsings(element) if get_parsings else element['parsings']
+                lemmas = dict.fromkeys(p['lemma'] for p in parsings if p.get('lemma'))
+                words.add((word_start, self.letters.count), {
+                    'string': element['string'],
+                    'begin': begin,
+                    'end': end,
+                    'lemma': '|'.join(lemmas),
+                    'speaker': speaker,
+                    'lang': lang,
+                    **{
+                        scheme: matrix.transcribe(letters, scheme)
+                            for scheme in matrix.schemes
+                    },
+                })
+                for char in element['endings']:
+                    if char.get('class') == 'LANG_END':
+                        lang = None
+
+            if self.letters.count >= paragraph_start:
+                paragraphs.add((paragraph_start, self.letters.count), {'number': number})
+
+        end_line()
+        if self.letters.count >= text_start:
+            self.types['text'].add((text_start, self.letters.count), {
+                key: tf_metadata(value) for key, value in metadata.items()
+            })
+
+    def write(self, outdir):
+        """Put the temporary files together into Text-Fabric files."""
+        for node_type in self.types.values():
+            node_type.close()
+        outdir.mkdir(parents=True, exist_ok=True)
+
+        # node number of the first node of each type, minus 1
+        offsets = {}
+        total = 0
+        for name, node_type in self.types.items():
+            offsets[name] = total
+            total += node_type.count
+
+        with open(outdir.joinpath('otype.tf'), 'w') as outfile:
+            outfile.write(tf_header('node', 'str'))
+            for name, node_type in self.types.items():
+                if node_type.count:
+                    first = offsets[name] + 1
+                    last = offsets[name] + node_type.count
+                    outfile.write(f'{slot_range(first, last)}\t{name}\n')
+
+        with open(outdir.joinpath('oslots.tf'), 'w') as outfile:
+            outfile.write(tf_header('edge', 'str'))
+            # only the first node is numbered, the others follow on
+            node = self.letters.count + 1
+            for name in NODE_TYPES[1:]:
+                with open(self.types[name].oslots.name, 'r') as infile:
+                    for line in infile:
+                        if node is not None:
+                            line = f'{node}\t{line}'
+                            node = None
+                        outfile.write(line)
+
+        features = sorted(set(
+            feature for node_type in self.types.values()
+                for feature in node_type.features
+        ))
+        for feature in features:
+            value_type = 'int' if feature in INT_FEATURES else 'str'
+            with open(outdir.joinpath(f'{feature}.tf'), 'w') as outfile:
+                outfile.write(tf_header('node', value_type))
+                for name, node_type in self.types.items():
+                    if feature not in node_type.features:
+                        continue
+                    offset = offsets[name]
+                    with open(node_type.features[feature].name, 'r') as infile:
+                        for line in infile:
+                            node, value = line.split('\t', 1)
+                            outfile.write(f'{int(node) + offset}\t{value}')
+
+        with open(outdir.joinpath('otext.tf'), 'w') as outfile:
+            outfile.write(
+                '@config\n'
+                '@sectionTypes=text,paragraph,line\n'
+                '@sectionFeatures=title,number,line_number\n'
+                '@fmt:text-orig-full={begin}{string}{end}\n'
+                '@writtenBy=nena_corpus tf_export.py\n'
+            )
+
+def export_tf(corpus, outdir):
+    """Export a parsed corpus to Text-Fabric feature files.
+
+    Arguments:
+        corpus (formats.Corpus): parsed corpus, in any format version
+        outdir (pathlib.Path): directory to write the .tf files to
+    """
+    outdir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=outdir) as tmpdir:
+        writer = TFWriter(Path(tmpdir))
+        for dialect, title in corpus.texts():
+            writer.add_text(corpus.read(dialect, title), corpus.get_parsings)
+        writer.write(outdir)
+
+def main(argv=None):
+    with open(CONFIG, 'r') as infile:
+        config = json.load(infile)
+    argparser = argparse.ArgumentParser(description='Export the parsed NENA corpus to Text-Fabric.')
+    argparser.add_argument('indir', nargs='?', type=Path,
+                           default=PROJECT.joinpath('parsed_texts', config['version']),
+                           help='directory of the parsed corpus, in any format')
+    argparser.add_argument('outdir', nargs='?', type=Path,
+                           default=TEXT_PARSER.joinpath(config['tf_outdir']),
+                           help='directory to write the Text-Fabric files to')
+    args = argparser.parse_args(argv)
+    if not config['tf_outdir'] and args.outdir == TEXT_PARSER:
+        raise Exception('no tf_outdir is set in config.json')
+    export_tf(Corpus(args.indir), args.outdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Parse NENA texts again each time they are saved.
+
+Run instructions:
+    python watch.py [--config FILE] [--version V] [--dialect D ...]
+                    [--format {1,2}] [--interval S] [indir] [outdir]
+
+The input directory, by default that of build.py, is checked every
+--interval seconds for .nena files that were saved since the last
+check. Each saved text is parsed and written to the output directory,
+as build.py would, and a line tells whether it parsed or where it
+failed. Press Ctrl-C to stop.
+
+Texts are parsed again by block, i.e. the attributes and each of the
+paragraphs, which are separated by blank lines (see parse_stream in
+nena_parser.py). The watcher keeps the parsed blocks of every text it
+parsed, by their source. When a text is saved, it is lexed again, and
+only the blocks whose source is new are parsed; the rest, and in
+format 1 also their JSON, are taken from the kept blocks. The first
+save of a text after the watcher starts parses all of its blocks.
+
+A block's tokens only depend on its own source and on the dialect
+set in the attributes, so the kept blocks of a text are dropped when
+its dialect changes. The standards are loaded once, when the watcher
+starts; restart it after changing them.
+
+The output is the same as that of build.py, and the build manifest
+is updated along with each text, so a later build does not parse it
+again. Format 3 texts share the parsings table of the corpus, so they
+can only be written by build.py.
+"""
+
+import time
+import hashlib
+import argparse
+from pathlib import Path
+
+from nena_parser import NenaLexer, BlockParser, split_blocks
+from formats import encode_text, encode_block, join_blocks
+from manifest import Manifest, MANIFEST_FILE, hash_dialect
+from build import load_config, corpus_dirs, write_data, CONFIG
+
+INTERVAL = 0.5
+FORMATS = (1, 2)
+
+class WatchedText:
+    """Parsed blocks of a text, kept from one save to the next."""
+
+    def __init__(self, mtime):
+        self.mtime = mtime
+        self.dialect = None
+        # (is attributes, source) to (parsed block, JSON or None)
+        self.blocks = {}
+
+class Watcher:
+    """Parses the texts of a corpus that were saved since the last check.
+
+    Arguments:
+        indir (pathlib.Path): directory with a subdirectory of
+            .nena files per dialect
+        outdir (pathlib.Path): directory to write parsed texts to
+        version (int): output format version, 1 or 2
+        dialects (list): if given, only watch texts of these dialects
+    """
+
+    def __init__(self, indir, outdir, version=1, dialects=None):
+        if version not in FORMATS:
+            raise Exception(f'format version {version} cannot be watched; choose from {FORMATS}')
+        self.indir = indir
+        self.outdir = outdir
+        self.version = version
+        self.dialects = dialects
+        self.manifest = Manifest(outdir.joinpath(MANIFEST_FILE), version)
+        self.dialect2parser = {}
+        self.dialect2hash = {}
+        # texts are only parsed once they are saved
+        self.texts = {file: WatchedText(mtime) for file, mtime in self.scan().items()}
+
+    def scan(self):
+        """Get the modification time of each watched text."""
+        files = {}
+        for file in sorted(self.indir.glob('*/*.nena')):
+            if self.dialects and file.parent.name not in self.dialects:
+                continue
+            try:
+                files[file] = file.stat().st_mtime_ns
+            except FileNotFoundError:
+                # deleted since the glob
+                pass
+        return files
+
+    def check(self):
+        """Parse the texts saved since the last check.
+
+        Returns:
+            list of 2-tuples of file and message
+        """
+        files = self.scan()
+        for file in set(self.texts) - set(files):
+            del self.texts[file]
+        messages = []
+        for file, mtime in files.items():
+            watched = self.texts.setdefault(file, WatchedText(None))
+            if watched.mtime == mtime:
+                continue
+            watched.mtime = mtime
+            start = time.perf_counter()
+            try:
+                parsed, total = self.update(file, watched)
+            except Exception as error:
+                messages.append((file, f'✗ {error}'))
+                continue
+            elapsed = time.perf_counter() - start
+            messages.append((file, f'√ {parsed} of {total} blocks parsed in {elapsed:.2f}s'))
+        return messages
+
+    def update(self, file, watched):
+        """Parse the new blocks of a text, and write the text.
+
+        Returns:
+            2-tuple of the number of blocks parsed and of all blocks
+        """
+        dialect = file.parent.name
+        if dialect not in self.dialect2parser:
+            self.dialect2parser[dialect] = BlockParser(dialect)
+            self.dialect2hash[dialect] = hash_dialect(dialect)
+        parser = self.dialect2parser[dialect]
+        source = file.read_bytes()
+        text = source.decode('utf8')
+
+        lexer = NenaLexer()
+        tokens = list(lexer.tokenize(text))
+        if lexer.dialect != watched.dialect:
+            watched.blocks = {}
+            watched.dialect = lexer.dialect
+
+        blocks = {}
+        keys = []
+        start = 0
+        parsed = 0
+        try:
+            for block_tokens, end in split_blocks(tokens):
+                stop = end.index if end is not None else len(text)
+                key = (not keys, text[start:stop])
+                start = end.end if end is not None else stop
+                block = watched.blocks.get(key) or blocks.get(key)
+                if block is None:
+                    value = parser.parse_block(block_tokens, not keys, end)
+                    block = (value, encode_block(value) if self.version == 1 else None)
+                    parsed += 1
+                blocks[key] = block
+                keys.append(key)
+            if len(keys) == 1:
+                # a text needs at least one paragraph
+                parser.error(None)
+        except Exception:
+            # blocks parsed before the error are kept for the next save
+            watched.blocks.update(blocks)
+            raise
+        watched.blocks = blocks
+
+        (attributes, attributes_json), *paragraphs = [blocks[key] for key in keys]
+        if self.version == 1:
+            data = join_blocks(attributes_json, [json for value, json in paragraphs])
+        else:
+            data = encode_text([attributes, [value for value, json in paragraphs]], self.version)
+        key = str(file.relative_to(self.indir))
+        write_data(data, self.outdir.joinpath(key).with_suffix('.json'))
+        self.manifest.update(key, hashlib.sha256(source).hexdigest(), self.dialect2hash[dialect])
+        self.manifest.save()
+        return parsed, len(keys)
+
+    def run(self, interval=INTERVAL):
+        """Check for saved texts until interrupted."""
+        print(f'watching {len(self.texts)} texts in {self.indir}')
+        while True:
+            for file, message in self.check():
+                print(f'{file.parent.name}/{file.name}: {message}', flush=True)
+            time.sleep(interval)
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Parse NENA texts again each time they are saved.')
+    argparser.add_argument('indir', nargs='?', type=Path,
+                           help='directory with a subdirectory of .nena files per dialect')
+    argparser.add_argument('outdir', nargs='?', type=Path,
+                           help='directory to write the parsed texts to')
+    argparser.add_argument('--config', type=Path, default=CONFIG,
+                           help='configuration file, see build.py')
+    argparser.add_argument('--version', metavar='V',
+                           help='corpus version, e.g. alpha')
+    argparser.add_argument('--dialect', action='append', metavar='D',
+                           help='only watch the texts of this dialect; can be repeated')
+    argparser.add_argument('--format', type=int, choices=FORMATS,
+                           help='output format version, see formats.py')
+    argparser.add_argument('--interval', type=float, default=INTERVAL,
+                           help='seconds between checks for saved texts')
+    args = argparser.parse_args(argv)
+
+    config = load_config(args.config)
+    indir, outdir = corpus_dirs(args, config)
+    version = args.format or config.get('format', 1)
+    dialects = args.dialect or config.get('dialects') or None
+    watcher = Watcher(indir, outdir, version, dialects)
+    try:
+        watcher.run(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""
+Inverted index of the words of a parsed corpus by their lexicon tags.
+
+Run instructions:
+    python word_index.py [--corpus DIR] [--rebuild] [--show N] QUERY
+
+The index maps each (feature, value) pair of the parsing records,
+e.g. ('pos', 'VERB') or ('lemma', 'xa'), to the sorted ids of the
+words that have it. The gloss is not indexed; list values, like
+pos_context, are indexed item by item. A word has a pair if any of
+its parsings has it.
+
+Word ids count the words of the corpus in the order of its texts,
+so they are turned into (text, line_number, position) by the index:
+text is 'dialect/title', line_number the number of the last line
+indicator before the word, and position the index of the word
+among the words of its text.
+
+Queries combine terms of the form feature=value with AND, OR, NOT
+and parentheses, e.g.
+
+    pos=VERB AND NOT (gn=F OR nu=PL)
+
+NOT binds more tightly than AND, and AND more tightly than OR. From
+Python, the same is done with the & | ~ operators on the result of
+`WordIndex.term`, or with `WordIndex.query` on a query string; a
+query that cannot be parsed raises QueryError.
+
+The index is kept as word_index.json in the corpus directory, and is
+built again when a text of the corpus changed after it was written.
+"""
+
+import re
+import sys
+import json
+import bisect
+import argparse
+from pathlib import Path
+
+from formats import Corpus
+
+PROJECT = Path(__file__).resolve().parent.parent
+VERSION = 'alpha'
+INDEX_VERSION = 1
+INDEX_FILE = 'word_index.json'
+
+# parsing keys that are not indexed
+SKIP_KEYS = {'gloss'}
+
+class QueryError(Exception):
+    """A query string or term that cannot be parsed."""
+
+class Words:
+    """Set of word ids, combined with & (AND), | (OR) and ~ (NOT)."""
+
+    def __init__(self, ids, universe):
+        self.ids = frozenset(ids)
+        self.universe = universe
+
+    def __and__(self, other):
+        return Words(self.ids & other.ids, self.universe)
+
+    def __or__(self, other):
+        return Words(self.ids | other.ids, self.universe)
+
+    def __invert__(self):
+        return Words(self.universe - self.ids, self.universe)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(sorted(self.ids))
+
+class WordIndex:
+    """Inverted index of (feature, value) pairs to word ids."""
+
+    def __init__(self, data):
+        self.texts = [f'{dialect}/{title}' for dialect, title in data['texts']]
+        self.text_words = data['text_words']
+        self.word_lines = data['word_lines']
+        self.postings = data['postings']
+        self.universe = frozenset(range(len(self.word_lines)))
+
+    def term(self, feature, value):
+        """Get the words with a value for a feature."""
+        if not feature or not value:
+            raise QueryError(f'expected feature=value, not {feature}={value}')
+        return Words(self.postings.get(feature, {}).get(value, ()), self.universe)
+
+    def query(self, string):
+        """Get the words that match a query string, see the module docs."""
+        return QueryParser(self, string).parse()
+
+    def locate(self, word):
+        """Get the (text, line_number, position) of a word id."""
+        text = bisect.bisect_right(self.text_words, word) - 1
+        return (self.texts[text], self.word_lines[word], word - self.text_words[text])
+
+    def hits(self, words):
+        """Locate a set of words, in corpus order."""
+        return [self.locate(word) for word in words]
+
+    def values(self, feature):
+        """Count the words for each value of a feature."""
+        return {value: len(ids) for value, ids in self.postings.get(feature, {}).items()}
+
+def index_corpus(corpus):
+    """Build the index data of a parsed corpus.
+
+    Arguments:
+        corpus (formats.Corpus): parsed corpus, in any format version
+
+    Returns:
+        dict as stored in word_index.json
+    """
+    texts = corpus.texts()
+    text_words = []
+    word_lines = []
+    postings = {}
+    for dialect, title in texts:
+        text_words.append(len(word_lines))
+        metadata, text_block = corpus.read(dialect, title)
+        line = None
+        for paragraph in text_block:
+            for element in paragraph:
+                if element.get('class') != 'word':
+                    line = int(element['line_number']) if 'line_number' in element else line
+                    continue
+                word = len(word_lines)
+                word_lines.append(line)
+                for parsing in corpus.get_parsings(element):
+                    for feature, values in parsing.items():
+                        if feature in SKIP_KEYS:
+                            continue
+                        if not isinstance(values, list):
+                            values = [values]
+                        for value in values:
+                            ids = postings.setdefault(feature, {}).setdefault(str(value), [])
+                            # a word can have the same value in several parsings
+                            if not ids or ids[-1] != word:
+                                ids.append(word)
+    return {
+        'format': INDEX_VERSION,
+        'texts': texts,
+        'text_words': text_words,
+        'word_lines': word_lines,
+        'postings': postings,
+    }
+
+def is_current(index_file, corpus):
+    """Check that no text of a corpus changed after its index was written."""
+    if not index_file.exists():
+        return False
+    written = index_file.stat().st_mtime_ns
+    return all(
+        file.stat().st_mtime_ns < written
+            for file in corpus.path.glob('*/*.json')
+    )
+
+def open_index(path, rebuild=False):
+    """Open the index of a parsed corpus, building it if needed.
+
+    Arguments:
+        path (str or pathlib.Path): directory of the parsed corpus
+        rebuild (bool): if True, build the index even if it is current
+
+    Returns:
+        WordIndex
+    """
+    corpus = Corpus(path)
+    index_file = corpus.path.joinpath(INDEX_FILE)
+    data = None
+    if not rebuild and is_current(index_file, corpus):
+        with open(index_file, 'r') as infile:
+            data = json.load(infile)
+        if data.get('format') != INDEX_VERSION or data['texts'] != [list(t) for t in corpus.texts()]:
+            data = None
+    if data is None:
+        data = index_corpus(corpus)
+        with open(index_file, 'w') as outfile:
+            json.dump(data, outfile, ensure_ascii=False, separators=(',', ':'))
+    return WordIndex(data)
+
+class QueryParser:
+    """Recursive descent parser of query strings.
+
+        or_query  := and_query ('OR' and_query)*
+        and_query := not_query ('AND' not_query)*
+        not_query := 'NOT' not_query | '(' or_query ')' | feature=value
+    """
+
+    token_re = re.compile(r'\s*(\(|\)|[^\s()=]+=[^\s()]+|[^\s()]+)')
+
+    def __init__(self, index, string):
+        self.index = index
+        self.string = string
+        self.tokens = []
+        pos = 0
+        string = string.rstrip()
+        while pos < len(string):
+            match = self.token_re.match(string, pos)
+            self.tokens.append(match.group(1))
+            pos = match.end()
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise QueryError(f'unexpected end of query: {self.string!r}')
+        self.pos += 1
+        return token
+
+    def parse(self):
+        words = self.or_query()
+        if self.peek() is not None:
+            raise QueryError(f'unexpected {self.peek()!r} in query: {self.string!r}')
+        return words
+
+    def or_query(self):
+        words = self.and_query()
+        while self.peek() == 'OR':
+            self.take()
+            words = words | self.and_query()
+        return words
+
+    def and_query(self):
+        words = self.not_query()
+        while self.peek() == 'AND':
+            self.take()
+            words = words & self.not_query()
+        return words
+
+    def not_query(self):
+        token = self.take()
+        if token == 'NOT':
+            return ~self.not_query()
+        if token == '(':
+            words = self.or_query()
+            if self.take() != ')':
+                raise QueryError(f'missing ) in query: {self.string!r}')
+            return words
+        if '=' not in token:
+            raise QueryError(f'expected feature=value, not {token!r}, in query: {self.string!r}')
+        feature, value = token.split('=', 1)
+        return self.index.term(feature, value)
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description='Query the words of the parsed NENA corpus.')
+    argparser.add_argument('query', help='e.g. "pos=VERB AND NOT gn=F"')
+    argparser.add_argument('--corpus', type=Path,
+                           default=PROJECT.joinpath('parsed_texts', VERSION),
+                           help='directory of the parsed corpus')
+    argparser.add_argument('--rebuild', action='store_true',
+                           help='build the index, even if it is up to date')
+    argparser.add_argument('--show', type=int, default=20,
+                           help='number of hits to show')
+    args = argparser.parse_args(argv)
+
+    index = open_index(args.corpus, rebuild=args.rebuild)
+    try:
+        words = index.query(args.query)
+    except QueryError as error:
+        argparser.error(str(error))
+    print(f'{len(words)} words')
+    for text, line, position in index.hits(list(words)[:args.show]):
+        print(f'{text}\tline {line}\tword {position}')
+
+if __name__ == '__main__':
+    main()